@@ -0,0 +1,110 @@
+import argparse
+import collections
+import multiprocessing
+import os
+import sys
+import time
+from collections import namedtuple
+
+from ChessVar import ChessVar, MoveStatus
+from GameRecord import read_games
+
+# games sent to a worker at a time
+DEFAULT_CHUNK_SIZE = 256
+# chunks waiting for or held by the workers, per worker; this bounds memory however long the input is
+CHUNKS_PER_WORKER = 4
+
+# the outcome of replaying one game
+ReplayResult = namedtuple("ReplayResult", "source number moves applied status state expected")
+
+
+def replay_chunk(chunk):
+    """
+    Replay a list of GameInputs in a worker process and return a ReplayResult for each
+    """
+    results = []
+    for game in chunk:
+        chess = ChessVar(quiet=True)
+        applied, status = chess.apply_moves(game.moves)
+        results.append(ReplayResult(game.source, game.number, len(game.moves), applied, status,
+                                    chess.get_game_state(), game.expected))
+    return results
+
+
+def chunks(games, chunk_size):
+    """
+    Yield lists of up to chunk_size games
+    """
+    chunk = []
+    for game in games:
+        chunk.append(game)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def replay_games(games, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Replay the games, an iterable of GameInputs, over a pool of worker processes and yield a ReplayResult for
+    every game, in input order, as the chunks finish. Only a few chunks per worker are in flight at a time,
+    so a stream of any length is replayed in flat memory.
+    """
+    workers = workers or os.cpu_count()
+    with multiprocessing.Pool(workers) as pool:
+        pending = collections.deque()
+        for chunk in chunks(games, chunk_size):
+            pending.append(pool.apply_async(replay_chunk, (chunk,)))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def is_valid(result):
+    """
+    Return True if every move of the replayed game was legal and it ended with the recorded result, if any
+    """
+    return result.status is MoveStatus.OK and result.expected in (None, result.state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay and validate recorded ChessVar games over all cores.")
+    parser.add_argument("paths", nargs="+",
+                        help="game archives, text files with one game per line, directories of them, or - for stdin")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default one per core)")
+    parser.add_argument("-c", "--chunk", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"games sent to a worker at a time (default {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print a line for every game, not only failures")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    games = invalid = 0
+    states = collections.Counter()
+    for result in replay_games(read_games(args.paths), args.workers, args.chunk):
+        games += 1
+        states[result.state] += 1
+        valid = is_valid(result)
+        if not valid:
+            invalid += 1
+        if args.verbose or not valid:
+            if result.status is not MoveStatus.OK:
+                outcome = f"illegal move {result.applied + 1} ({result.status.value})"
+            elif not valid:
+                outcome = f"ended {result.state}, recorded {result.expected}"
+            else:
+                outcome = "ok"
+            print(f"{result.source}:{result.number}  {result.applied}/{result.moves} moves  {result.state}  {outcome}")
+
+    seconds = time.perf_counter() - start
+    rate = games / seconds if seconds > 0 else 0.0
+    print(f"{games} games  {games - invalid} valid  {invalid} invalid  "
+          + "  ".join(f"{state} {count}" for state, count in sorted(states.items())))
+    print(f"{seconds:.3f}s  {rate:.0f} games/s  {args.workers} workers")
+    sys.exit(0 if invalid == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
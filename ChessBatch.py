@@ -0,0 +1,359 @@
+import argparse
+import random
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from ChessVar import (BETWEEN_MASKS, BLACK, CODE_COUNT, CODE_VALUES, DIRECTION_STEPS, LEAPER_ATTACKS, LINE_DIRECTIONS,
+                      PAWN, PAWN_ATTACKS, PAWN_START_ROW, PAWN_STEP, PIECE_CODES, PIECE_GLYPHS, PIECE_RULES,
+                      RESERVE_VALUE, SLIDER_DIRECTION_BITS, SLIDER_DIRECTIONS, TYPE_MASK, WHITE, ChessVar,
+                      piece_targets)
+
+# Positions are packed into an (N, 64) int8 array, one row of ChessVar piece codes
+# per position in board order, and an (N, 2) array of the fairy pieces each side
+# still holds in reserve. Every score is in centipawns from white's point of view.
+#
+# A position's side to move is packed as its colour bit, WHITE or BLACK, or 0
+# once the game is over.
+#
+# Mobility is counted on bitboards held as uint64 arrays with one entry per
+# position, so every shift and mask works on the whole batch at once. A piece's
+# moves are found by shifting its code's bitboard one leap or ray step at a time;
+# the squares reached by one step, or by one ray direction, are distinct for
+# distinct pieces, so popcounts of those sets add up to each piece's own count.
+# The popcounts use np.bitwise_count, which needs NumPy 2.0 or later.
+SQUARES = np.arange(64)
+# piece codes fit in this many bits
+CODE_BITS = (CODE_COUNT - 1).bit_length()
+FILE_MASKS = tuple(0x0101010101010101 << col for col in range(8))
+ROW_MASKS = tuple(0xFF << (row * 8) for row in range(8))
+
+# mobility bonus per reachable square, indexed by piece type
+MOBILITY_WEIGHTS = tuple(rule.mobility for rule in PIECE_RULES.values())
+
+BatchScores = namedtuple("BatchScores", "material piece_square mobility total")
+
+
+def board_step(row_step, col_step):
+    """
+    Return (shift, mask) for moving every piece of a bitboard by the given steps: the square index change and
+    the squares that can be reached without wrapping around the board's edge
+    """
+    mask = 0xFFFFFFFFFFFFFFFF
+    for col in range(8):
+        if not 0 <= col - col_step < 8:
+            mask &= ~FILE_MASKS[col]
+    return row_step * 8 + col_step, np.uint64(mask)
+
+
+def table_steps(table):
+    """
+    Return the board_step() of every (row step, column step) found in a table of bitboards indexed by square
+    """
+    steps = set()
+    for square, targets in enumerate(table):
+        for target in range(64):
+            if targets >> target & 1:
+                steps.add((target // 8 - square // 8, target % 8 - square % 8))
+    return tuple(board_step(*step) for step in sorted(steps))
+
+
+def shift(bitboards, step):
+    """
+    Return the bitboards moved by a board_step()
+    """
+    offset, mask = step
+    if offset > 0:
+        return (bitboards << np.uint64(offset)) & mask
+    return (bitboards >> np.uint64(-offset)) & mask
+
+
+# the steps of every piece code, compiled from the ChessVar tables
+LEAP_STEPS = tuple(table_steps(table) for table in LEAPER_ATTACKS)
+SLIDE_STEPS = tuple(tuple(board_step(*DIRECTION_STEPS[direction]) for direction in directions)
+                    for directions in SLIDER_DIRECTIONS)
+PAWN_CAPTURE_STEPS = {color: table_steps(PAWN_ATTACKS[color]) for color in (WHITE, BLACK)}
+PAWN_PUSH_STEPS = {color: board_step(PAWN_STEP[color] // 8, 0) for color in (WHITE, BLACK)}
+# squares a pawn stands on after the first step of a double step
+PAWN_DOUBLE_ROWS = {color: np.uint64(ROW_MASKS[PAWN_START_ROW[color] + PAWN_STEP[color] // 8])
+                    for color in (WHITE, BLACK)}
+# SIGNS[code] is 1 for white pieces, -1 for black ones and 0 for an empty square
+SIGNS = np.array([1 if code & WHITE else -1 if code & BLACK else 0 for code in range(CODE_COUNT)], dtype=np.int32)
+MATERIAL = SIGNS * np.array(CODE_VALUES, dtype=np.int32)
+MOBILITY = SIGNS * np.array([MOBILITY_WEIGHTS[code & TYPE_MASK] if code in PIECE_GLYPHS else 0
+                             for code in range(CODE_COUNT)], dtype=np.int32)
+
+
+# The ChessVar move tables as arrays, so candidate moves can be looked up a whole batch at a time:
+# the leaps and the directions of every piece code, and the line direction and squares between
+# of every start * 64 + end pair
+LEAP_TARGETS = np.array(LEAPER_ATTACKS, dtype=np.uint64)
+DIRECTION_BITS = np.array(SLIDER_DIRECTION_BITS, dtype=np.int32)
+LINES = np.array(LINE_DIRECTIONS, dtype=np.int32)
+BETWEEN = np.array(BETWEEN_MASKS, dtype=np.uint64)
+# PAWN_CAPTURES[code, square] holds the squares a pawn captures on, and PAWN_PUSHES and PAWN_DOUBLE_PUSHES
+# the square one step ahead and, from its start row, two steps ahead; all are 0 for other pieces
+PAWN_CAPTURES = np.zeros((CODE_COUNT, 64), dtype=np.uint64)
+PAWN_PUSHES = np.zeros((CODE_COUNT, 64), dtype=np.uint64)
+PAWN_DOUBLE_PUSHES = np.zeros((CODE_COUNT, 64), dtype=np.uint64)
+for color in (WHITE, BLACK):
+    PAWN_CAPTURES[color | PAWN] = PAWN_ATTACKS[color]
+    for square in range(64):
+        one_step = square + PAWN_STEP[color]
+        if 0 <= one_step < 64:
+            PAWN_PUSHES[color | PAWN, square] = 1 << one_step
+            if square >> 3 == PAWN_START_ROW[color]:
+                PAWN_DOUBLE_PUSHES[color | PAWN, square] = 1 << (one_step + PAWN_STEP[color])
+
+
+def build_piece_square_table():
+    """
+    Return the piece-square bonus of every piece code on every square, signed for the piece's colour.
+    Each piece type gains its PieceRule's centre weight for every ring it stands closer to the centre and its
+    advance weight for every rank it has advanced: pawns from their start rank, other pieces from the home rank.
+    """
+    table = np.zeros((CODE_COUNT, 64), dtype=np.int32)
+    for square in range(64):
+        row, col = divmod(square, 8)
+        centre = 3 - int(max(abs(row - 3.5), abs(col - 3.5)))
+        for color in (WHITE, BLACK):
+            rank = 7 - row if color == WHITE else row
+            for piece_type, rule in PIECE_RULES.items():
+                advanced = max(rank - 1, 0) if piece_type == PAWN else rank
+                value = rule.centre * centre + rule.advance * advanced
+                table[color | piece_type, square] = value if color == WHITE else -value
+    return table
+
+
+PIECE_SQUARE = build_piece_square_table()
+# the same table flattened, indexed by code * 64 + square
+PIECE_SQUARE_VALUES = PIECE_SQUARE.astype(np.int16).ravel()
+
+
+def board_to_row(board):
+    """
+    Return a board from ChessVar.get_board_codes() as a packed int8 row of 64 piece codes
+    """
+    return np.frombuffer(bytes(board), dtype=np.int8).copy()
+
+
+def row_to_board(row):
+    """
+    Return a packed row of 64 piece codes as a bytearray in the layout of ChessVar.get_board_codes()
+    """
+    return bytearray(np.asarray(row, dtype=np.int8).tobytes())
+
+
+def pack_games(games):
+    """
+    Return the (N, 64) board array and (N, 2) reserve array of a sequence of ChessVar games
+    """
+    games = list(games)
+    boards = np.frombuffer(b"".join(game.get_board_codes() for game in games), dtype=np.int8).reshape(len(games), 64)
+    reserves = np.array([(len(game.get_fairy_codes("WHITE")), len(game.get_fairy_codes("BLACK"))) for game in games],
+                        dtype=np.int8).reshape(len(games), 2)
+    return boards, reserves
+
+
+def to_bitboards(boards):
+    """
+    Return the (CODE_COUNT, N) uint64 array of bitboards of every piece code in an (N, 64) board array.
+    The board array is packed into one bitboard per bit of the piece codes, and each code's bitboard is the
+    squares whose bits all match it.
+    """
+    planes = [np.packbits(boards & (1 << bit) != 0, axis=1, bitorder="little").view("<u8")[:, 0]
+              for bit in range(CODE_BITS)]
+    bitboards = np.zeros((CODE_COUNT, len(boards)), dtype=np.uint64)
+    for code in PIECE_GLYPHS:
+        bitboard = ~np.zeros(len(boards), dtype=np.uint64)
+        for bit, plane in enumerate(planes):
+            bitboard &= plane if code >> bit & 1 else ~plane
+        bitboards[code] = bitboard
+    return bitboards
+
+
+def count_mobility(bitboards):
+    """
+    Return for every position the mobility score: the squares each piece can move to, weighted by MOBILITY,
+    counting captures and moves to empty squares but not moves onto the side's own pieces
+    """
+    white = np.bitwise_or.reduce(bitboards[list(PIECE_CODES[WHITE])])
+    black = np.bitwise_or.reduce(bitboards[list(PIECE_CODES[BLACK])])
+    empty = ~(white | black)
+    mobility = np.zeros(bitboards.shape[1], dtype=np.int32)
+    for color, own, enemies in ((WHITE, white, black), (BLACK, black, white)):
+        targets = ~own
+        pawns = bitboards[color | PAWN]
+        for step in PAWN_CAPTURE_STEPS[color]:
+            mobility += MOBILITY[color | PAWN] * np.bitwise_count(shift(pawns, step) & enemies)
+        single = shift(pawns, PAWN_PUSH_STEPS[color]) & empty
+        double = shift(single & PAWN_DOUBLE_ROWS[color], PAWN_PUSH_STEPS[color]) & empty
+        mobility += MOBILITY[color | PAWN] * (np.bitwise_count(single) + np.bitwise_count(double))
+        for code in PIECE_CODES[color]:
+            if code & TYPE_MASK == PAWN:
+                continue
+            weight = MOBILITY[code]
+            for step in LEAP_STEPS[code]:
+                mobility += weight * np.bitwise_count(shift(bitboards[code], step) & targets)
+            for step in SLIDE_STEPS[code]:
+                front = bitboards[code]
+                ray = np.zeros_like(front)
+                for _ in range(7):
+                    front = shift(front, step)
+                    ray |= front
+                    front &= empty
+                mobility += weight * np.bitwise_count(ray & targets)
+    return mobility
+
+
+def evaluate_batch(boards, reserves=None):
+    """
+    Score a batch of positions in one call.
+    boards is an (N, 64) array of piece codes and reserves an optional (N, 2) array with the number of fairy pieces
+    white and black still hold in reserve. Returns a BatchScores of int32 arrays of length N, from white's point
+    of view: material (pieces on the board and fairy pieces in reserve), the piece-square bonus, mobility,
+    and their total.
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    bitboards = to_bitboards(boards)
+    material = np.zeros(len(boards), dtype=np.int32)
+    for code in PIECE_GLYPHS:
+        material += MATERIAL[code] * np.bitwise_count(bitboards[code])
+    if reserves is not None:
+        reserves = np.asarray(reserves, dtype=np.int32)
+        material += RESERVE_VALUE * (reserves[:, 0] - reserves[:, 1])
+    piece_square = PIECE_SQUARE_VALUES[boards.astype(np.intp) << 6 | SQUARES].sum(axis=1, dtype=np.int32)
+    mobility = count_mobility(bitboards)
+    return BatchScores(material, piece_square, mobility, material + piece_square + mobility)
+
+
+def pack_turns(games):
+    """
+    Return the (N,) array of the side to move in a sequence of ChessVar games: WHITE or BLACK, or 0 once a game is over
+    """
+    return np.array([0 if game.get_game_state() != "UNFINISHED" else WHITE if game.get_turn() == "WHITE" else BLACK
+                     for game in games], dtype=np.int8)
+
+
+def legal_mask(boards, turns, starts, ends, positions=None):
+    """
+    Return a boolean array telling which candidate moves are legal, by the rules check_move() applies.
+    boards is an (N, 64) array of piece codes and turns the (N,) array of the side to move in each, as from
+    pack_turns(). Candidate i moves the piece on square starts[i] to ends[i] in position positions[i];
+    without positions there is one candidate per position. Squares are board indices 0-63, and squares
+    outside the board make a candidate illegal. Nothing is changed and nothing is printed.
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    turns = np.asarray(turns, dtype=np.int8)
+    starts = np.asarray(starts, dtype=np.intp)
+    ends = np.asarray(ends, dtype=np.intp)
+    positions = np.arange(len(boards)) if positions is None else np.asarray(positions, dtype=np.intp)
+    on_board = (starts >= 0) & (starts < 64) & (ends >= 0) & (ends < 64)
+    starts = np.where(on_board, starts, 0)
+    ends = np.where(on_board, ends, 0)
+
+    occupied = np.packbits(boards != 0, axis=1, bitorder="little").view("<u8")[:, 0][positions]
+    piece = boards[positions, starts]
+    target = boards[positions, ends]
+    color = turns[positions]
+    # the side to move's own piece, moved somewhere else that does not hold another of its pieces
+    legal = on_board & (piece & color != 0) & (starts != ends) & (target & color == 0)
+
+    end_bits = np.uint64(1) << ends.astype(np.uint64)
+    empty_end = target == 0
+    # leapers and pawns: the end square is among the piece's targets
+    reach = LEAP_TARGETS[piece, starts] & end_bits
+    reach |= np.where(empty_end, 0, PAWN_CAPTURES[piece, starts]) & end_bits
+    pushes = PAWN_PUSHES[piece, starts]
+    reach |= np.where(empty_end, pushes, 0) & end_bits
+    double_pushes = np.where(empty_end & (occupied & pushes == 0), PAWN_DOUBLE_PUSHES[piece, starts], 0)
+    reach |= double_pushes & end_bits
+    # sliders: the end square lies on one of the piece's directions with nothing in between
+    lines = starts << 6 | ends
+    slides = (DIRECTION_BITS[piece] >> LINES[lines] & 1 != 0) & (BETWEEN[lines] & occupied == 0)
+    return legal & ((reach != 0) | slides)
+
+
+def evaluate_game(game):
+    """
+    Return the BatchScores of a single game as plain ints, scored square by square in Python.
+    This is what evaluate_batch() does for a whole batch at once, and the yardstick it is measured against.
+    """
+    board = game.get_board_codes()
+    white, black = game.get_occupied("WHITE"), game.get_occupied("BLACK")
+    occupied = white | black
+    material = RESERVE_VALUE * (len(game.get_fairy_codes("WHITE")) - len(game.get_fairy_codes("BLACK")))
+    piece_square = mobility = 0
+    for square in range(64):
+        piece = board[square]
+        if not piece:
+            continue
+        own, enemies = (white, black) if piece & WHITE else (black, white)
+        material += int(MATERIAL[piece])
+        piece_square += int(PIECE_SQUARE[piece, square])
+        mobility += int(MOBILITY[piece]) * bin(piece_targets(piece, square, occupied, enemies) & ~own).count("1")
+    return BatchScores(material, piece_square, mobility, material + piece_square + mobility)
+
+
+def random_games(count, max_moves, seed=0):
+    """
+    Return count games reached by up to max_moves random moves from the start
+    """
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = ChessVar(quiet=True)
+        for _ in range(rng.randrange(max_moves + 1)):
+            moves = list(game.generate_moves())
+            if not moves:
+                break
+            game.push(rng.choice(moves))
+        games.append(game)
+    return games
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score many ChessVar positions at once with NumPy.")
+    parser.add_argument("-n", "--positions", type=int, default=10000, help="number of positions (default 10000)")
+    parser.add_argument("-m", "--moves", type=int, default=60, help="most random moves played to reach a position")
+    parser.add_argument("-k", "--candidates", type=int, default=20,
+                        help="random candidate moves per position checked for legality (default 20)")
+    args = parser.parse_args()
+
+    games = random_games(args.positions, args.moves)
+    boards, reserves = pack_games(games)
+
+    start = time.perf_counter()
+    scores = evaluate_batch(boards, reserves)
+    batch_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for game in games:
+        evaluate_game(game)
+    single_seconds = time.perf_counter() - start
+
+    print(f"{len(games)} positions  batch {batch_seconds:.3f}s ({len(games) / batch_seconds:.0f}/s)  "
+          f"one at a time {single_seconds:.3f}s ({len(games) / single_seconds:.0f}/s)")
+    print(f"mean material {scores.material.mean():.1f}  piece-square {scores.piece_square.mean():.1f}  "
+          f"mobility {scores.mobility.mean():.1f}  total {scores.total.mean():.1f}")
+
+    rng = np.random.default_rng(0)
+    positions = np.repeat(np.arange(len(games)), args.candidates)
+    starts = rng.integers(0, 64, len(positions))
+    ends = rng.integers(0, 64, len(positions))
+    turns = pack_turns(games)
+    start = time.perf_counter()
+    legal = legal_mask(boards, turns, starts, ends, positions)
+    batch_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for position, square, end in zip(positions.tolist(), starts.tolist(), ends.tolist()):
+        games[position].check_move(square, end)
+    single_seconds = time.perf_counter() - start
+
+    print(f"{len(positions)} candidate moves  {int(legal.sum())} legal  "
+          f"batch {batch_seconds:.3f}s ({len(positions) / batch_seconds:.0f}/s)  "
+          f"one at a time {single_seconds:.3f}s ({len(positions) / single_seconds:.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
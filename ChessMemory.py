@@ -0,0 +1,66 @@
+import argparse
+import gc
+import sys
+import tracemalloc
+
+from ChessVar import ChessVar
+
+# attributes of a game, for the per-attribute breakdown
+ATTRIBUTES = ChessVar.__slots__
+
+
+def measure_games(count, moves=""):
+    """
+    Create count live games, each with the space separated moves played, and return the bytes allocated per game
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = []
+    for _ in range(count):
+        game = ChessVar(quiet=True)
+        if moves:
+            game.apply_moves(moves)
+        games.append(game)
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # the list holding the games is not part of their cost
+    return (allocated - sys.getsizeof(games)) / count
+
+
+def attribute_sizes(game):
+    """
+    Return (attribute, bytes, shared) for every attribute of a game, counting lists with the ints they hold.
+    shared is True for values every game points to, such as True or 'WHITE', and for values still shared with
+    the starting position, which cost the game nothing of its own.
+    """
+    start = ChessVar(quiet=True)
+    sizes = []
+    for name in ATTRIBUTES:
+        value = getattr(game, name)
+        size = sys.getsizeof(value)
+        if isinstance(value, list):
+            size += sum(sys.getsizeof(item) for item in value if isinstance(item, int) and item > 256)
+        shared = isinstance(value, (bool, str)) or value is getattr(start, name)
+        sizes.append((name, size, shared))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory used by live ChessVar games.")
+    parser.add_argument("-g", "--games", type=int, default=100000, help="number of games to keep alive (default 100000)")
+    parser.add_argument("-m", "--moves", default="",
+                        help="space separated moves to play in every game first, so they no longer share the start")
+    args = parser.parse_args()
+
+    per_game = measure_games(args.games, args.moves)
+    print(f"{args.games} games  {per_game:.0f} bytes per game  {per_game * args.games / 1024 / 1024:.1f} MiB in total")
+    game = ChessVar(quiet=True)
+    game.apply_moves(args.moves)
+    print(f"object itself {sys.getsizeof(game)} bytes (no __dict__)")
+    for name, size, shared in attribute_sizes(game):
+        print(f"  {name:<20} {size:>6} bytes{'  shared' if shared else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import sys
+import time
+
+from ChessVar import ChessVar, MOVE_CAPTURE, MOVE_DROP
+
+# Reference positions reached from the starting board by the listed moves, with
+# the expected leaf node count for each depth starting at 1.
+REFERENCE_POSITIONS = (
+    ("initial", "",
+     (20, 400, 8902, 197750)),
+    ("fairies in reserve", "g1f3 b8c6 f3e5 c6e5 H@g1 d7d5 e2e3 e5c4 f1c4 d5c4",
+     (21, 671, 15760, 542116)),
+    ("falcons entered", "g1f3 b8c6 f3e5 c6e5 H@g1 d7d5 e2e3 e5c4 f1c4 d5c4 F@f1 f@b8",
+     (21, 587, 13290, 408959)),
+    ("all fairies on board", "g1f3 b8c6 f3e5 c6e5 H@g1 d7d5 e2e3 e5c4 f1c4 d5c4 F@f1 f@b8 "
+                             "g2g4 c8g4 f1d3 c7c6 d3c4 h@c7",
+     (26, 685, 18601, 484861)),
+)
+
+
+def setup_position(moves):
+    """
+    Return a new game with the space separated moves played from the starting board.
+    Moves are written like 'e2e4', and fairy piece entries like 'F@h2'.
+    """
+    game = ChessVar(quiet=True)
+    for move in moves.split():
+        if "@" in move:
+            result = game.enter_fairy_piece(move[0], move[2:])
+        else:
+            result = game.make_move(move[:2], move[2:])
+        if not result:
+            raise ValueError(f"illegal move in setup: {move} ({result.status.value})")
+    return game
+
+
+def perft(game, depth, kinds=None):
+    """
+    Count the positions reached after exactly depth moves from the game's position.
+    If kinds is a list of three counters, the moves leading to those positions are
+    added to it as quiet moves, captures and fairy piece entries.
+    """
+    if depth == 0:
+        return 1
+
+    moves = list(game.generate_moves())
+    if depth == 1:
+        if kinds is not None:
+            for move in moves:
+                kinds[2 if move & MOVE_DROP else 1 if move & MOVE_CAPTURE else 0] += 1
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        game.push(move)
+        nodes += perft(game, depth - 1, kinds)
+        game.pop()
+    return nodes
+
+
+def run_position(name, moves, expected, max_depth, out=sys.stdout):
+    """
+    Run perft on one position for every depth up to max_depth and print a line per depth.
+    Returns False if a node count differs from the expected one.
+    """
+    game = setup_position(moves)
+    print(f"{name}", file=out)
+    print(f"{'depth':>5} {'nodes':>12} {'quiet':>12} {'capture':>10} {'drop':>10} {'seconds':>9} {'nodes/s':>10}  expected",
+          file=out)
+    passed = True
+    for depth in range(1, max_depth + 1):
+        kinds = [0, 0, 0]
+        start = time.perf_counter()
+        nodes = perft(game, depth, kinds)
+        elapsed = time.perf_counter() - start
+
+        if depth <= len(expected):
+            status = "ok" if nodes == expected[depth - 1] else f"MISMATCH ({expected[depth - 1]})"
+            passed = passed and nodes == expected[depth - 1]
+        else:
+            status = "-"
+        rate = nodes / elapsed if elapsed > 0 else float("inf")
+        print(f"{depth:>5} {nodes:>12} {kinds[0]:>12} {kinds[1]:>10} {kinds[2]:>10} {elapsed:>9.3f} {rate:>10.0f}  {status}",
+              file=out)
+    print(file=out)
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count ChessVar move generation leaf nodes and report throughput.")
+    parser.add_argument("-d", "--depth", type=int, default=3, help="deepest depth to search (default 3)")
+    parser.add_argument("-p", "--position", action="append",
+                        help="name of a reference position to run, may be repeated (default all)")
+    parser.add_argument("-m", "--moves", help="run a custom position reached by these space separated moves instead")
+    args = parser.parse_args()
+
+    if args.moves is not None:
+        positions = [("custom", args.moves, ())]
+    else:
+        positions = [position for position in REFERENCE_POSITIONS
+                     if args.position is None or position[0] in args.position]
+        if not positions:
+            parser.error("unknown position, choose from: " + ", ".join(p[0] for p in REFERENCE_POSITIONS))
+
+    passed = True
+    for name, moves, expected in positions:
+        passed = run_position(name, moves, expected, args.depth) and passed
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
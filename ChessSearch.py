@@ -0,0 +1,316 @@
+import argparse
+import time
+from collections import namedtuple
+
+from ChessVar import KING, MOVE_CAPTURE, MOVE_DROP, PIECE_VALUES, RESERVE_VALUE, TYPE_MASK, ChessVar, move_to_str
+from TranspositionTable import EXACT, LOWER, UPPER, TranspositionTable
+
+# material comes from PIECE_VALUES and RESERVE_VALUE in ChessVar; losing the king ends the game,
+# so it is scored as a mate.
+MATE_SCORE = 100000
+MAX_PLY = 64
+INFINITY = MATE_SCORE + 1
+
+# the clock and node budget are checked every this many nodes
+CHECK_INTERVAL = 256
+# megabytes of transposition table a search allocates when it is not given one
+DEFAULT_TABLE_MB = 16
+
+SearchResult = namedtuple("SearchResult", "move score depth nodes seconds nodes_per_second")
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time or node budget has run out
+    """
+
+
+def score_to_table(score, ply):
+    """
+    Convert a mate score relative to the root into one relative to the current node before storing it
+    """
+    if score >= MATE_SCORE - MAX_PLY:
+        return score + ply
+    if score <= -MATE_SCORE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """
+    Convert a mate score stored relative to a node back into one relative to the root
+    """
+    if score >= MATE_SCORE - MAX_PLY:
+        return score - ply
+    if score <= -MATE_SCORE + MAX_PLY:
+        return score + ply
+    return score
+
+
+def evaluate(game):
+    """
+    Return the material balance of the game from the point of view of the side to move.
+    This runs at every leaf, so it reads the material counters the game keeps up to date instead of counting.
+    """
+    score = game.get_material("WHITE") - game.get_material("BLACK")
+    score += RESERVE_VALUE * (len(game.get_fairy_codes("WHITE")) - len(game.get_fairy_codes("BLACK")))
+    return score if game.get_turn() == "WHITE" else -score
+
+
+class ChessSearch():
+    """
+    Class that picks a move for the side to move in a ChessVar game.
+    It runs a negamax alpha-beta search with iterative deepening and a quiescence search over captures,
+    and stops when a time or node budget runs out, answering with the best move of the deepest finished iteration.
+    Fairy piece entries are searched like any other move. The game is explored with push() and pop()
+    and is left exactly as it was found.
+    Positions reached again by another move order are looked up in a transposition table keyed by the position hash;
+    pass the same table to later searches to keep what was learned.
+    """
+
+    def __init__(self, game, table=None):
+        self._game = game
+        self._table = table if table is not None else TranspositionTable(DEFAULT_TABLE_MB)
+        self._nodes = 0
+        self._deadline = None
+        self._max_nodes = None
+
+    def search(self, max_time=None, max_nodes=None, max_depth=MAX_PLY, report=None):
+        """
+        Search the game's position and return a SearchResult with the best move, its score in centipawns,
+        the depth of the deepest finished iteration, the nodes searched, the seconds taken and nodes per second.
+        max_time is in seconds and max_nodes limits the nodes searched; with neither the search runs to max_depth.
+        report, when given, is called with a SearchResult after every finished iteration.
+        The move is None if the side to move has no moves.
+        """
+        game = self._game
+        start_time = self.start_budget(max_time, max_nodes)
+        self._table.new_search()
+
+        moves = self.order_moves(game.generate_moves())
+        best_move, best_score, finished_depth = (moves[0] if moves else None), 0, 0
+
+        for depth in range(1, max_depth + 1):
+            if not moves:
+                break
+            try:
+                score, move = self.search_root(moves, depth)
+            except SearchTimeout:
+                break
+            best_move, best_score, finished_depth = move, score, depth
+            # search the best move first in the next iteration
+            moves.remove(move)
+            moves.insert(0, move)
+            if report is not None:
+                report(self.result(best_move, best_score, finished_depth, start_time))
+            if abs(score) >= MATE_SCORE - MAX_PLY:
+                break
+
+        return self.result(best_move, best_score, finished_depth, start_time)
+
+    def score_move(self, move, depth, alpha=-INFINITY, beta=INFINITY, max_time=None, max_nodes=None):
+        """
+        Return the score for the side to move of making move, searched depth plies deep within the alpha-beta window.
+        Scores at or below alpha are upper bounds. Raises SearchTimeout if the budget runs out first.
+        get_nodes() afterwards tells how many nodes were searched.
+        """
+        game = self._game
+        self.start_budget(max_time, max_nodes)
+        game.push(move)
+        try:
+            return -self.negamax(depth - 1, -beta, -alpha, 1)
+        finally:
+            game.pop()
+
+    def get_nodes(self):
+        """
+        return the number of nodes searched by the last search
+        """
+        return self._nodes
+
+    def start_budget(self, max_time, max_nodes):
+        """
+        Reset the node count and set the time and node budget of a search, returning its start time
+        """
+        start_time = time.perf_counter()
+        self._nodes = 0
+        self._deadline = start_time + max_time if max_time is not None else None
+        self._max_nodes = max_nodes
+        return start_time
+
+    def result(self, move, score, depth, start_time):
+        """
+        Build a SearchResult for the search started at start_time
+        """
+        seconds = time.perf_counter() - start_time
+        rate = self._nodes / seconds if seconds > 0 else 0.0
+        return SearchResult(move, score, depth, self._nodes, seconds, rate)
+
+    def search_root(self, moves, depth):
+        """
+        Search every root move to depth and return the best score and move
+        """
+        game = self._game
+        alpha = -INFINITY
+        best_move = moves[0]
+        for move in moves:
+            game.push(move)
+            try:
+                score = -self.negamax(depth - 1, -INFINITY, -alpha, 1)
+            finally:
+                game.pop()
+            if score > alpha:
+                alpha, best_move = score, move
+        self._table.store(game.get_hash(), depth, EXACT, alpha, best_move)
+        return alpha, best_move
+
+    def get_table(self):
+        """
+        Return the transposition table used by the search
+        """
+        return self._table
+
+    def negamax(self, depth, alpha, beta, ply):
+        """
+        Return the score of the position for the side to move, searched depth plies deep within the alpha-beta window
+        """
+        self.count_node()
+        game = self._game
+        if game.get_game_state() != "UNFINISHED":
+            # the side to move has just lost its king; prefer the quickest win
+            return -MATE_SCORE + ply
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(alpha, beta, ply)
+
+        key = game.get_hash()
+        entry = self._table.probe(key)
+        table_move = 0
+        if entry is not None:
+            entry_depth, bound, score, table_move = entry
+            if entry_depth >= depth:
+                score = score_from_table(score, ply)
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    return score
+
+        moves = self.order_moves(game.generate_moves())
+        if not moves:
+            return 0
+        if table_move in moves:
+            # the best move from an earlier search of this position is tried first
+            moves.remove(table_move)
+            moves.insert(0, table_move)
+
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, 0
+        for move in moves:
+            game.push(move)
+            try:
+                score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.pop()
+            if score > best_score:
+                best_score, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    if score >= beta:
+                        break
+
+        if best_score >= beta:
+            bound = LOWER
+        elif best_score > original_alpha:
+            bound = EXACT
+        else:
+            bound = UPPER
+        self._table.store(key, depth, bound, score_to_table(best_score, ply), best_move)
+        return best_score
+
+    def quiescence(self, alpha, beta, ply):
+        """
+        Search only captures until the position is quiet so that leaves are not scored in the middle of an exchange
+        """
+        game = self._game
+        if game.get_game_state() != "UNFINISHED":
+            return -MATE_SCORE + ply
+        stand_pat = evaluate(game)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        for move in self.order_moves(move for move in game.generate_moves() if move & MOVE_CAPTURE):
+            self.count_node()
+            game.push(move)
+            try:
+                score = -self.quiescence(-beta, -alpha, ply + 1)
+            finally:
+                game.pop()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def order_moves(self, moves):
+        """
+        Return the moves as a list with captures first, most valuable victim and then least valuable attacker first,
+        followed by fairy piece entries and quiet moves
+        """
+        board = self._game.get_board_codes()
+
+        def move_order(move):
+            if move & MOVE_CAPTURE:
+                victim = board[move >> 6 & 63] & TYPE_MASK
+                attacker = board[move & 63] & TYPE_MASK
+                if victim == KING:
+                    return -INFINITY
+                return PIECE_VALUES[attacker] - 10 * PIECE_VALUES[victim]
+            return 0 if move & MOVE_DROP else 1
+
+        return sorted(moves, key=move_order)
+
+    def count_node(self):
+        """
+        Count a searched node and raise SearchTimeout once the budget is spent
+        """
+        self._nodes += 1
+        if self._nodes % CHECK_INTERVAL == 0:
+            if self._max_nodes is not None and self._nodes >= self._max_nodes:
+                raise SearchTimeout()
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                raise SearchTimeout()
+
+
+def print_result(result):
+    """
+    Print one line of search output
+    """
+    move = move_to_str(result.move) if result.move is not None else "none"
+    print(f"depth {result.depth:>2}  score {result.score:>7}  nodes {result.nodes:>9}  "
+          f"time {result.seconds:>7.3f}s  nps {result.nodes_per_second:>9.0f}  move {move}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick a ChessVar move with an alpha-beta search.")
+    parser.add_argument("-m", "--moves", default="", help="space separated moves leading to the position to search")
+    parser.add_argument("-t", "--time", type=float, default=1.0, help="seconds to search (default 1.0)")
+    parser.add_argument("-n", "--nodes", type=int, help="maximum number of nodes to search")
+    parser.add_argument("-d", "--depth", type=int, default=MAX_PLY, help="maximum depth to search")
+    parser.add_argument("--hash", type=int, default=DEFAULT_TABLE_MB,
+                        help=f"transposition table size in megabytes (default {DEFAULT_TABLE_MB})")
+    args = parser.parse_args()
+
+    game = ChessVar(quiet=True)
+    result = game.apply_moves(args.moves)
+    if not result:
+        parser.error(f"illegal move in setup: {args.moves.split()[result.applied]} ({result.status.value})")
+    table = TranspositionTable(args.hash)
+    result = ChessSearch(game, table).search(args.time, args.nodes, args.depth, report=print_result)
+    print("best", end=" ")
+    print_result(result)
+    stats = table.get_stats()
+    print(f"table  entries {table.get_size()}  probes {stats['probes']}  hits {stats['hits']}  "
+          f"hit rate {stats['hit_rate']:.1%}  occupancy {stats['occupancy']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import random
+import time
+
+from ChessVar import GLYPH_CODES, LETTERS, MOVE_CODES, SQUARE_INDEX, ChessVar, move_to_str
+from MoveCache import DEFAULT_CAPACITY, MoveCache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7362
+# bytes read from a client at a time; every complete line in them is answered with one write
+READ_SIZE = 65536
+# a client whose unsent replies pass this many bytes is not read from until they drain
+WRITE_HIGH_WATER = 256 * 1024
+# longest command line accepted; a client that sends more without a newline is disconnected
+MAX_LINE = 1024
+
+
+class ChessServer():
+    """
+    Class that hosts many ChessVar games in one process and serves them over asyncio streams.
+    Clients send one command per line and get one reply line per command, starting with OK or ERR:
+
+        NEW                  -> OK <game id>
+        MOVE <id> e2e4       -> OK <captured piece letter or -> <game state>
+        MOVE <id> F@h2          (a fairy piece entry, also written DROP <id> F h2)
+        STATE <id>           -> OK <game state> <turn>
+        BOARD <id>           -> OK <position notation>
+        CLOSE <id>           -> OK
+        STATS                -> OK games <count> hits <count> misses <count> evictions <count>
+        QUIT                    closes the connection
+
+    Games live in memory and may be used from any connection until closed, and the games a connection started
+    are closed when it ends. All games share one MoveCache, so
+    moves in positions many games pass through, such as popular openings, are checked with a set lookup.
+    All the complete lines read from a client are answered with a single write, and the server stops reading from
+    a client whose replies are not being read until its send buffer drains. Lines longer than MAX_LINE get an ERR
+    reply, and a client that sends that much without a newline gets one and is disconnected.
+    """
+
+    def __init__(self, cache_size=DEFAULT_CAPACITY):
+        """
+        cache_size is the number of positions the shared move cache holds, or 0 for no cache
+        """
+        self._games = {}
+        self._next_id = 1
+        self._move_cache = MoveCache(cache_size) if cache_size else None
+        self._commands = {
+            "NEW": self.new_game,
+            "MOVE": self.move,
+            "DROP": self.drop,
+            "STATE": self.state,
+            "BOARD": self.board,
+            "CLOSE": self.close_game,
+            "STATS": self.stats,
+        }
+
+    def get_game_count(self):
+        """
+        return the number of games being hosted
+        """
+        return len(self._games)
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Serve clients on host and port until cancelled
+        """
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_client(self, reader, writer):
+        """
+        Answer the commands of one client connection until it sends QUIT or disconnects,
+        then close the games it started
+        """
+        writer.transport.set_write_buffer_limits(WRITE_HIGH_WATER)
+        pending = b""
+        started = set()
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                lines = (pending + data).split(b"\n")
+                pending = lines.pop()
+                replies = []
+                for line in lines:
+                    if len(line) > MAX_LINE:
+                        replies.append("ERR line too long\n")
+                        continue
+                    command = line.decode("utf-8", "replace").split()
+                    if command and command[0].upper() == "QUIT":
+                        writer.write("".join(replies).encode())
+                        return
+                    replies.append(self.handle_command(command, started) + "\n")
+                if len(pending) > MAX_LINE:
+                    replies.append("ERR line too long\n")
+                    writer.write("".join(replies).encode())
+                    return
+                if replies:
+                    writer.write("".join(replies).encode())
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            for game_id in started:
+                self._games.pop(game_id, None)
+
+    def handle_command(self, command, started=None):
+        """
+        Run one command given as its words and return the reply line without the newline.
+        The ids of games started with NEW are added to the set started, if given.
+        A command that fails unexpectedly gets an ERR reply instead of ending the client's session.
+        """
+        if not command:
+            return "ERR empty command"
+        handler = self._commands.get(command[0].upper())
+        if handler is None:
+            return f"ERR unknown command {command[0]}"
+        if command[0].upper() == "NEW":
+            return handler(started)
+        if command[0].upper() == "STATS":
+            return handler()
+        if len(command) < 2:
+            return f"ERR {command[0]} needs a game id"
+        try:
+            game = self._games[int(command[1])]
+        except (ValueError, KeyError):
+            return f"ERR no game {command[1]}"
+        try:
+            return handler(int(command[1]), game, command[2:])
+        except Exception as error:
+            return f"ERR {command[0]} failed: {error!r}"
+
+    def new_game(self, started=None):
+        """
+        Start a new game and reply with its id, which is added to the set started if given
+        """
+        game_id = self._next_id
+        self._next_id += 1
+        self._games[game_id] = ChessVar(quiet=True, move_cache=self._move_cache)
+        if started is not None:
+            started.add(game_id)
+        return f"OK {game_id}"
+
+    def move(self, game_id, game, args):
+        """
+        Make a move such as e2e4, or a fairy piece entry such as F@h2
+        """
+        if len(args) != 1:
+            return "ERR MOVE needs a move such as e2e4 or F@h2"
+        if args[0] not in MOVE_CODES:
+            return "ERR bad move"
+        if args[0][1] == "@":
+            return self.move_reply(game, game.enter_fairy_piece(args[0][0], args[0][2:]))
+        return self.move_reply(game, game.make_move(args[0][:2], args[0][2:]))
+
+    def drop(self, game_id, game, args):
+        """
+        Enter a fairy piece, given as its letter and square
+        """
+        if len(args) != 2:
+            return "ERR DROP needs a fairy piece and a square"
+        if args[0] not in GLYPH_CODES or args[1] not in SQUARE_INDEX:
+            return "ERR bad move"
+        return self.move_reply(game, game.enter_fairy_piece(args[0], args[1]))
+
+    def move_reply(self, game, result):
+        """
+        Turn the MoveResult of a move into a reply line
+        """
+        if not result:
+            return f"ERR {result.status.value}"
+        captured = LETTERS[GLYPH_CODES[result.captured]] if result.captured is not None else "-"
+        return f"OK {captured} {game.get_game_state()}"
+
+    def state(self, game_id, game, args):
+        """
+        Reply with the game state and the side to move
+        """
+        return f"OK {game.get_game_state()} {game.get_turn()}"
+
+    def board(self, game_id, game, args):
+        """
+        Reply with the position in position notation
+        """
+        return f"OK {game.to_notation()}"
+
+    def close_game(self, game_id, game, args):
+        """
+        Stop hosting a game
+        """
+        del self._games[game_id]
+        return "OK"
+
+    def stats(self):
+        """
+        Reply with the number of games hosted and the move cache's hit, miss and eviction counters
+        """
+        cache = self._move_cache.get_stats() if self._move_cache is not None else {}
+        return (f"OK games {len(self._games)} hits {cache.get('hits', 0)} misses {cache.get('misses', 0)} "
+                f"evictions {cache.get('evictions', 0)}")
+
+
+async def play_client(host, port, moves, latencies, seed):
+    """
+    Play random legal moves over one connection, closing each game that ends and starting a new one,
+    and append the seconds each move took to answer to latencies
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(seed)
+    game_id = game = None
+    for _ in range(moves):
+        if game is None or game.get_game_state() != "UNFINISHED":
+            if game is not None:
+                await close_client_game(reader, writer, game_id)
+            writer.write(b"NEW\n")
+            game_id = int((await reader.readline()).split()[1])
+            game = ChessVar(quiet=True)
+        move = move_to_str(rng.choice(list(game.generate_moves())))
+        start = time.perf_counter()
+        writer.write(f"MOVE {game_id} {move}\n".encode())
+        reply = await reader.readline()
+        latencies.append(time.perf_counter() - start)
+        if not reply.startswith(b"OK"):
+            raise RuntimeError(f"server refused {move}: {reply.decode().strip()}")
+        game.apply_moves([move])
+    if game is not None:
+        await close_client_game(reader, writer, game_id)
+    writer.write(b"QUIT\n")
+    writer.close()
+
+
+async def close_client_game(reader, writer, game_id):
+    """
+    Send CLOSE for a game over a client connection and check the reply
+    """
+    writer.write(f"CLOSE {game_id}\n".encode())
+    reply = await reader.readline()
+    if not reply.startswith(b"OK"):
+        raise RuntimeError(f"server refused to close game {game_id}: {reply.decode().strip()}")
+
+
+async def run_load(host, port, clients, moves):
+    """
+    Connect clients at once, each playing moves moves, and return (latencies in seconds, total seconds)
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(play_client(host, port, moves, latencies, seed) for seed in range(clients)))
+    return latencies, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    """
+    Return the value below which the given fraction of the sorted values lie
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host ChessVar games over a line protocol, or load test a server.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the game server")
+    load = commands.add_parser("load", help="play random games against a running server and report move latency")
+    for command in (serve, load):
+        command.add_argument("--host", default=DEFAULT_HOST, help=f"address to use (default {DEFAULT_HOST})")
+        command.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to use (default {DEFAULT_PORT})")
+    serve.add_argument("--cache", type=int, default=DEFAULT_CAPACITY,
+                       help=f"positions kept in the shared move cache, 0 for none (default {DEFAULT_CAPACITY})")
+    load.add_argument("-c", "--clients", type=int, default=100, help="concurrent client connections (default 100)")
+    load.add_argument("-m", "--moves", type=int, default=100, help="moves each client plays (default 100)")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(ChessServer(args.cache).serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    latencies, seconds = asyncio.run(run_load(args.host, args.port, args.clients, args.moves))
+    latencies.sort()
+    print(f"{len(latencies)} moves  {args.clients} clients  {seconds:.3f}s  {len(latencies) / seconds:.0f} moves/s")
+    print(f"latency p50 {percentile(latencies, 0.50) * 1000:.2f}ms  p99 {percentile(latencies, 0.99) * 1000:.2f}ms  "
+          f"max {latencies[-1] * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
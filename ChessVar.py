@@ -1,3 +1,415 @@
+import random
+from collections import namedtuple
+from enum import Enum
+
+# Piece codes stored on the board. The low four bits hold the piece type and
+# the two bits above them hold the colour, so either can be read with a mask.
+# Eight of the sixteen types are in use; the widest code still fits the 6-bit
+# field in which a packed fairy piece entry keeps the entering piece.
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, FALCON, HUNTER = range(8)
+TYPE_MASK = 0x0F
+WHITE = 0x10
+BLACK = 0x20
+COLOR_MASK = 0x30
+
+# Bitboards are Python ints where bit n stands for the square with board index n.
+# Directions as (row step, column step), north being towards rank 8 (row 0).
+NORTH, NORTH_EAST, EAST, SOUTH_EAST, SOUTH, SOUTH_WEST, WEST, NORTH_WEST = range(8)
+DIRECTION_STEPS = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+# rays in these directions run towards higher square indices
+POSITIVE_DIRECTIONS = (False, False, True, True, True, True, False, False)
+
+PAWN_START_ROW = {WHITE: 6, BLACK: 1}
+PAWN_STEP = {WHITE: -8, BLACK: 8}
+
+
+def build_leaper_table(offsets):
+    """
+    Return for every square the bitboard of squares reached by one of the offsets
+    """
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        mask = 0
+        for row_step, col_step in offsets:
+            if 0 <= row + row_step < 8 and 0 <= col + col_step < 8:
+                mask |= 1 << ((row + row_step) * 8 + col + col_step)
+        table.append(mask)
+    return tuple(table)
+
+
+def build_ray_table(row_step, col_step):
+    """
+    Return for every square the bitboard of all squares in one direction up to the edge
+    """
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        mask = 0
+        row, col = row + row_step, col + col_step
+        while 0 <= row < 8 and 0 <= col < 8:
+            mask |= 1 << (row * 8 + col)
+            row, col = row + row_step, col + col_step
+        table.append(mask)
+    return tuple(table)
+
+
+PAWN_ATTACKS = {WHITE: build_leaper_table(((-1, -1), (-1, 1))),
+                BLACK: build_leaper_table(((1, -1), (1, 1)))}
+RAY_MASKS = tuple(build_ray_table(row_step, col_step) for row_step, col_step in DIRECTION_STEPS)
+
+# Registry of every piece type: how it is shown and valued, and how it moves,
+# written from white's side of the board and mirrored for black when compiled:
+#   letter          the white piece's letter in position notation, lowercase for black
+#   glyphs          the (white, black) symbols shown on the printed board
+#   value           material value; losing the king ends the game, so it carries none
+#   mobility        evaluation bonus per reachable square
+#   centre          piece-square bonus per ring closer to the centre
+#   advance         piece-square bonus per rank advanced, pawns counted from their start rank
+#   leaps           (row step, column step) offsets the piece jumps to
+#   slides          directions the piece slides along until it meets a piece
+#   forward_slides  directions of which the piece only uses those leading forward
+#   backward_slides directions of which the piece only uses those leading backward
+#   message         why a move that breaks the rule is refused
+# Pawns have no entries; their pushes and diagonal captures are built into piece_targets().
+PieceRule = namedtuple("PieceRule",
+                       "letter glyphs value mobility centre advance leaps slides forward_slides backward_slides message")
+ORTHOGONAL = (NORTH, EAST, SOUTH, WEST)
+DIAGONAL = (NORTH_EAST, SOUTH_EAST, SOUTH_WEST, NORTH_WEST)
+PIECE_RULES = {
+    PAWN: PieceRule("P", ("♟︎", "♙"), 100, 1, 0, 8, (), (), (), (),
+                    "Pawns can only move forward or capture diagonally"),
+    KNIGHT: PieceRule("N", ("♞", "♘"), 300, 4, 10, 0,
+                      ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)), (), (), (),
+                      "Knights can only move in L-shape"),
+    BISHOP: PieceRule("B", ("♝", "♗"), 320, 3, 5, 0, (), DIAGONAL, (), (),
+                      "Bishops can only move diagonally"),
+    ROOK: PieceRule("R", ("♜", "♖"), 500, 2, 0, 0, (), ORTHOGONAL, (), (),
+                    "Rooks can only move along ranks or files"),
+    QUEEN: PieceRule("Q", ("♛", "♕"), 900, 1, 2, 0, (), ORTHOGONAL + DIAGONAL, (), (),
+                     "Queens can only move diagonally, horizontally or vertically"),
+    KING: PieceRule("K", ("♚", "♔"), 0, 0, 0, -10, DIRECTION_STEPS, (), (), (),
+                    "Kings can only move one square in any direction"),
+    FALCON: PieceRule("F", ("F", "f"), 450, 3, 6, 0, (), (), DIAGONAL, ORTHOGONAL,
+                      "Falcon can only move forward like a Bishop or backward like a rook"),
+    HUNTER: PieceRule("H", ("H", "h"), 450, 3, 6, 0, (), (), ORTHOGONAL, DIAGONAL,
+                      "Hunter can only move forward like a rook or backward like a bishop"),
+}
+# direction each direction becomes when the board is mirrored for black
+MIRRORED_DIRECTIONS = (SOUTH, SOUTH_EAST, EAST, NORTH_EAST, NORTH, NORTH_WEST, WEST, SOUTH_WEST)
+
+# tables of the registry indexed by piece type or piece code, and the codes of each side's pieces
+PIECE_GLYPHS = {color | piece_type: rule.glyphs[color == BLACK]
+                for color in (WHITE, BLACK) for piece_type, rule in PIECE_RULES.items()}
+PIECE_CODES = {color: tuple(color | piece_type for piece_type in PIECE_RULES) for color in (WHITE, BLACK)}
+CODE_COUNT = BLACK + TYPE_MASK + 1
+GLYPHS = tuple(PIECE_GLYPHS.get(code, ".") for code in range(CODE_COUNT))
+GLYPH_CODES = {glyph: code for code, glyph in PIECE_GLYPHS.items()}
+PIECE_VALUES = tuple(rule.value for rule in PIECE_RULES.values())
+# a fairy piece still in reserve is worth less than one on the board
+RESERVE_VALUE = 200
+CODE_VALUES = tuple(PIECE_VALUES[code & TYPE_MASK] if code in PIECE_GLYPHS else 0 for code in range(CODE_COUNT))
+# A game keeps its bitboards in a list with one slot per piece code in use, white's first, rather than one per
+# possible code: BITBOARD_SLOTS[code] is the slot of a piece code and BITBOARD_COUNT the length of the list.
+BITBOARD_SLOTS = {code: slot for slot, code in enumerate(PIECE_CODES[WHITE] + PIECE_CODES[BLACK])}
+BITBOARD_COUNT = len(BITBOARD_SLOTS)
+BITBOARD_SLOTS = tuple(BITBOARD_SLOTS.get(code) for code in range(CODE_COUNT))
+
+# order of the major pieces on the back ranks, king on the d file
+BACK_RANK = (ROOK, KNIGHT, BISHOP, KING, QUEEN, BISHOP, KNIGHT, ROOK)
+
+
+def compile_piece_rule(rule, color):
+    """
+    Return (leap table, slide directions) for a PieceRule played by color: the bitboard of the squares the piece
+    leaps to from every square, and the directions it slides in
+    """
+    forward = -1 if color == WHITE else 1
+    leaps = tuple((-forward * row_step, col_step) for row_step, col_step in rule.leaps)
+    directions = set(rule.slides)
+    directions.update(direction for direction in rule.forward_slides if DIRECTION_STEPS[direction][0] == -1)
+    directions.update(direction for direction in rule.backward_slides if DIRECTION_STEPS[direction][0] == 1)
+    if color == BLACK:
+        directions = {MIRRORED_DIRECTIONS[direction] for direction in directions}
+    return build_leaper_table(leaps), tuple(sorted(directions))
+
+
+# the registry compiled once into tables indexed by piece code
+LEAPER_ATTACKS = [(0,) * 64] * CODE_COUNT
+SLIDER_DIRECTIONS = [()] * CODE_COUNT
+for color in (WHITE, BLACK):
+    for piece_type, rule in PIECE_RULES.items():
+        LEAPER_ATTACKS[color | piece_type], SLIDER_DIRECTIONS[color | piece_type] = compile_piece_rule(rule, color)
+LEAPER_ATTACKS = tuple(LEAPER_ATTACKS)
+SLIDER_DIRECTIONS = tuple(SLIDER_DIRECTIONS)
+# the same directions as one bit per direction, indexed by piece code and 0 for pieces that do not slide
+SLIDER_DIRECTION_BITS = tuple(sum(1 << direction for direction in directions) for directions in SLIDER_DIRECTIONS)
+
+# RAY_SQUARES[direction][square] lists the squares on the ray from square in that
+# direction, nearest first. From them every pair of squares on a common line gets
+# the direction from one to the other and the bitboard of the squares between
+# them, both indexed by start * 64 + end. Pairs not on a line get NO_DIRECTION,
+# which is outside every piece's direction bits.
+NO_DIRECTION = 8
+RAY_SQUARES = tuple(
+    tuple(tuple((row + step * row_step) * 8 + col + step * col_step
+                for step in range(1, 8)
+                if 0 <= row + step * row_step < 8 and 0 <= col + step * col_step < 8)
+          for row, col in (divmod(square, 8) for square in range(64)))
+    for row_step, col_step in DIRECTION_STEPS)
+LINE_DIRECTIONS = [NO_DIRECTION] * 4096
+BETWEEN_MASKS = [0] * 4096
+for direction, rays in enumerate(RAY_SQUARES):
+    for square, ray in enumerate(rays):
+        between = 0
+        for target in ray:
+            LINE_DIRECTIONS[square << 6 | target] = direction
+            BETWEEN_MASKS[square << 6 | target] = between
+            between |= 1 << target
+LINE_DIRECTIONS = tuple(LINE_DIRECTIONS)
+BETWEEN_MASKS = tuple(BETWEEN_MASKS)
+
+# Tables for asking whether a square is attacked, looking outwards from the square.
+# REVERSE_LEAPER_ATTACKS[code][square] holds the squares from which a leaper of that
+# code reaches square, and LEAPERS[color] pairs that table with the bitboard slot of
+# every leaper of color. SLIDERS_FROM[color][direction] holds the bitboard slots of the
+# codes of color that slide back along direction, so the first piece met that way
+# attacks the square.
+REVERSE_LEAPER_ATTACKS = [[0] * 64 for code in range(CODE_COUNT)]
+for code, table in enumerate(LEAPER_ATTACKS):
+    for square, targets in enumerate(table):
+        while targets:
+            target_bit = targets & -targets
+            targets ^= target_bit
+            REVERSE_LEAPER_ATTACKS[code][target_bit.bit_length() - 1] |= 1 << square
+REVERSE_LEAPER_ATTACKS = tuple(tuple(table) for table in REVERSE_LEAPER_ATTACKS)
+LEAPERS = {color: tuple((REVERSE_LEAPER_ATTACKS[code], BITBOARD_SLOTS[code]) for code in PIECE_CODES[color]
+                        if any(LEAPER_ATTACKS[code]))
+           for color in (WHITE, BLACK)}
+SLIDERS_FROM = {color: tuple(tuple(BITBOARD_SLOTS[code] for code in PIECE_CODES[color]
+                                   if SLIDER_DIRECTION_BITS[code] >> ((direction + 4) & 7) & 1)
+                             for direction in range(8))
+                for color in (WHITE, BLACK)}
+
+
+def ray_attacks(direction, square, occupied):
+    """
+    Return the squares a slider on square reaches in one direction, stopping at the first piece
+    """
+    ray = RAY_MASKS[direction][square]
+    blockers = ray & occupied
+    if blockers:
+        if POSITIVE_DIRECTIONS[direction]:
+            first = (blockers & -blockers).bit_length() - 1
+        else:
+            first = blockers.bit_length() - 1
+        ray ^= RAY_MASKS[direction][first]
+    return ray
+
+
+def piece_targets(piece, square, occupied, enemies):
+    """
+    Return the bitboard of squares the piece on square can move to, ignoring which
+    of them hold its own pieces. occupied holds every piece and enemies the
+    opponent's pieces, which pawns need to capture diagonally.
+    """
+    piece_type = piece & TYPE_MASK
+    if piece_type == PAWN:
+        color = piece & COLOR_MASK
+        step = PAWN_STEP[color]
+        targets = PAWN_ATTACKS[color][square] & enemies
+        one_step = square + step
+        if 0 <= one_step < 64 and not occupied >> one_step & 1:
+            targets |= 1 << one_step
+            if square >> 3 == PAWN_START_ROW[color] and not occupied >> (one_step + step) & 1:
+                targets |= 1 << (one_step + step)
+        return targets
+    targets = LEAPER_ATTACKS[piece][square]
+    for direction in SLIDER_DIRECTIONS[piece]:
+        targets |= ray_attacks(direction, square, occupied)
+    return targets
+
+
+# Moves are packed into ints: bits 0-5 hold the start square and bits 6-11 the
+# end square. A fairy piece entry sets MOVE_DROP and keeps the entering piece's
+# code in the start field; MOVE_CAPTURE marks moves that take a piece.
+MOVE_DROP = 1 << 12
+MOVE_CAPTURE = 1 << 13
+SQUARE_NAMES = tuple(col + str(8 - row) for row in range(8) for col in "abcdefgh")
+SQUARE_INDEX = {name: square for square, name in enumerate(SQUARE_NAMES)}
+HOME_RANKS = {WHITE: 0xFFFF << 48, BLACK: 0xFFFF}
+
+
+# Position notation, one line of space separated fields like FEN:
+#   rnbkqbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBKQBNR w * - FHfh
+# the board from rank 8 down with digits for runs of empty squares, the side to
+# move, the game state, the lost major pieces and the fairy pieces in reserve.
+# Uppercase letters are white pieces, lowercase black, and '-' is an empty list.
+NOTATION_LETTERS = "".join(rule.letter for rule in PIECE_RULES.values())
+LETTERS = tuple(
+    (NOTATION_LETTERS[code & TYPE_MASK] if code & WHITE else NOTATION_LETTERS[code & TYPE_MASK].lower())
+    if code in PIECE_GLYPHS else "." for code in range(CODE_COUNT))
+LETTER_CODES = {letter: code for code, letter in enumerate(LETTERS) if letter != "."}
+GAME_STATE_NOTATION = {"UNFINISHED": "*", "WHITE_WON": "1-0", "BLACK_WON": "0-1", "DRAW": "1/2-1/2"}
+NOTATION_GAME_STATES = {notation: state for state, notation in GAME_STATE_NOTATION.items()}
+# the digit for every run of empty squares and the squares it expands to; a str.replace per digit
+# expands a whole board faster than str.translate with a dictionary
+EMPTY_RUNS = tuple((str(count), "." * count) for count in range(1, 9))
+# a board with its runs expanded: 8 ranks of 8 squares with a separator after each of the first 7
+EXPANDED_LENGTH = 8 * 9 - 1
+# bytes.translate table from notation letters to piece codes, with 0xFF for characters that are not pieces
+NOTATION_CODES = bytearray(b"\xff" * 256)
+NOTATION_CODES[ord(".")] = EMPTY
+for letter, code in LETTER_CODES.items():
+    NOTATION_CODES[ord(letter)] = code
+NOTATION_CODES = bytes(NOTATION_CODES)
+# bytes.translate table from piece codes to notation letters
+CODE_LETTERS = bytes(ord(letter) for letter in LETTERS) + b"?" * (256 - CODE_COUNT)
+
+
+# Zobrist keys for the position hash. A fixed seed keeps hashes stable between
+# runs so they can be stored. Besides the pieces on their squares the hash covers
+# the side to move, the fairy pieces still in reserve and each side's count of
+# lost major pieces (capped at 2), which decide whether fairy pieces may enter.
+zobrist_random = random.Random(0x5EED_C4E55)
+ZOBRIST_PIECES = tuple(tuple(zobrist_random.getrandbits(64) for square in range(64)) for code in range(CODE_COUNT))
+ZOBRIST_RESERVE = tuple(zobrist_random.getrandbits(64) for code in range(CODE_COUNT))
+ZOBRIST_LOST = {color: tuple(zobrist_random.getrandbits(64) for count in range(3)) for color in (WHITE, BLACK)}
+ZOBRIST_BLACK_TO_MOVE = zobrist_random.getrandbits(64)
+del zobrist_random
+
+
+def zobrist_hash(board, turn, white_lost, black_lost, white_reserve, black_reserve):
+    """
+    Return the Zobrist hash of a position given as its 64 piece codes, side to move ('WHITE' or 'BLACK'),
+    the codes of each side's lost pieces and the codes of each side's fairy pieces in reserve
+    """
+    result = ZOBRIST_BLACK_TO_MOVE if turn == "BLACK" else 0
+    for square, piece in enumerate(board):
+        if piece != EMPTY:
+            result ^= ZOBRIST_PIECES[piece][square]
+    for piece in bytes(white_reserve) + bytes(black_reserve):
+        result ^= ZOBRIST_RESERVE[piece]
+    result ^= ZOBRIST_LOST[WHITE][min(len(white_lost), 2)] ^ ZOBRIST_LOST[BLACK][min(len(black_lost), 2)]
+    return result
+
+
+def move_to_str(move):
+    """
+    Return a packed move in coordinate notation, e.g. 'e2e4', or 'F@h2' for a fairy piece entry
+    """
+    end = SQUARE_NAMES[move >> 6 & 63]
+    if move & MOVE_DROP:
+        return GLYPHS[move & 63] + "@" + end
+    return SQUARE_NAMES[move & 63] + end
+
+
+# packed move for the coordinate notation of every move between two squares and of
+# every fairy piece entry, so a move is parsed with a single dictionary lookup
+MOVE_CODES = {SQUARE_NAMES[start] + SQUARE_NAMES[end]: start | end << 6 for start in range(64) for end in range(64)}
+for color in (WHITE, BLACK):
+    for piece_type in (FALCON, HUNTER):
+        for end in range(64):
+            MOVE_CODES[GLYPHS[color | piece_type] + "@" + SQUARE_NAMES[end]] = MOVE_DROP | color | piece_type | end << 6
+
+
+def str_to_move(text):
+    """
+    Return the packed move for coordinate notation such as 'e2e4', or 'F@h2' for a fairy piece entry.
+    The move is not checked against any position and carries no capture flag. Raises ValueError if text is not a move.
+    """
+    move = MOVE_CODES.get(text)
+    if move is None:
+        raise ValueError(f"not a move: {text!r}")
+    return move
+
+
+def is_major(code):
+    """
+    Return True if the code is a piece other than a pawn
+    """
+    return code & COLOR_MASK != 0 and code & TYPE_MASK != PAWN
+
+
+class MoveStatus(Enum):
+    """
+    Outcome of an attempt to make a move or enter a fairy piece
+    """
+    OK = "ok"
+    OUT_OF_BOUNDS = "out of bounds"
+    GAME_OVER = "game over"
+    NO_PIECE = "no piece"
+    NOT_YOUR_PIECE = "not your piece"
+    NO_MOVEMENT = "no movement"
+    OWN_PIECE_CAPTURE = "own piece capture"
+    BLOCKED = "blocked"
+    ILLEGAL_PATTERN = "illegal pattern"
+    NOT_IN_RESERVE = "not in reserve"
+    NO_LOST_PIECE = "no lost piece"
+    NOT_HOME_RANK = "not home rank"
+    SQUARE_OCCUPIED = "square occupied"
+    BAD_NOTATION = "bad notation"
+
+
+class MoveResult(namedtuple("MoveResult", "status captured")):
+    """
+    Result of a move in quiet mode: a MoveStatus and the symbol of the captured piece, or None.
+    It is true only when the move was made.
+    """
+    __slots__ = ()
+
+    def __bool__(self):
+        return self.status is MoveStatus.OK
+
+
+class ApplyResult(namedtuple("ApplyResult", "applied status")):
+    """
+    Result of apply_moves(): the number of moves made and the MoveStatus of the first illegal move, or MoveStatus.OK.
+    It is true only when every move was made.
+    """
+    __slots__ = ()
+
+    def __bool__(self):
+        return self.status is MoveStatus.OK
+
+
+# message printed for each failed move outside quiet mode
+STATUS_MESSAGES = {
+    MoveStatus.OUT_OF_BOUNDS: "Invalid move: Out of bounds\n",
+    MoveStatus.BAD_NOTATION: "Invalid move: Squares are written as a file and a rank, like e4\n",
+    MoveStatus.GAME_OVER: "Invalid move: The game is already over\n",
+    MoveStatus.NO_PIECE: "There is no piece on this square\n",
+    MoveStatus.NOT_YOUR_PIECE: "Invalid move: This is not your piece\n",
+    MoveStatus.NO_MOVEMENT: "Invalid move: You have to move your piece\n",
+    MoveStatus.OWN_PIECE_CAPTURE: "Invalid move: You are trying to capture your piece\n",
+    MoveStatus.BLOCKED: "Invalid move: There are pieces in the way\n",
+    MoveStatus.NOT_IN_RESERVE: "Fairy piece cannot enter: it is not in your reserve\n",
+    MoveStatus.NO_LOST_PIECE: "Fairy piece cannot enter: you have not lost a major piece\n",
+    MoveStatus.NOT_HOME_RANK: "Fairy piece cannot enter this location\n",
+    MoveStatus.SQUARE_OCCUPIED: "Fairy piece cannot enter this location\n",
+}
+
+
+def square_status(name):
+    """
+    Return the MoveStatus of a square name that is not on the board: OUT_OF_BOUNDS for a file letter followed by
+    a rank number, such as 'i5' or 'e10', and BAD_NOTATION for anything else
+    """
+    if isinstance(name, str) and len(name) >= 2 and name[0].isalpha() and name[1:].isdigit():
+        return MoveStatus.OUT_OF_BOUNDS
+    return MoveStatus.BAD_NOTATION
+
+
+# message printed for an illegal pattern, indexed by piece type
+PATTERN_MESSAGES = tuple(f"Invalid move: {rule.message}\n" for rule in PIECE_RULES.values())
+
+
+# the fields of the starting position, built once from a game with the board and bitboards frozen into bytes
+# and a tuple; new games share them and copy the board and bitboards when they first move
+_STARTING_POSITION = None
+
+
 class ChessVar():
     """
     Class representing a basic implementation of a chess game.
@@ -5,77 +417,323 @@ class ChessVar():
     The class includes attributes for storing the current board configuration, player turns, game state, and captured pieces.
     It supports methods for initializing the board, retrieving the game state, printing the board, switching player turns, and converting chess square notation to coordinates.
     The class also serves as a foundational structure for implementing chess game logic and can be extended to include more advanced features such as piece movement and capturing.
+    The board is a flat bytearray of 64 piece codes indexed by row * 8 + col, with row 0 being rank 8.
+    In quiet mode moves print nothing and return a MoveResult instead of True or False.
+    Instances keep their state in __slots__ rather than a __dict__, and every table that does not change with
+    the position is module level and shared by all games, so a game costs under a kilobyte.
+    snapshot() branches a game into a child that shares its state until one of them moves.
     """
 
-    def __init__(self):
-        self._board = self.board_init()
+    __slots__ = ("_quiet", "_board", "_bitboards", "_white_occupied", "_black_occupied", "_turn", "_game_state",
+                 "_white_lost_pieces", "_black_lost_pieces", "_white_fairy_pieces", "_black_fairy_pieces",
+                 "_history", "_hash", "_attack_cache", "_white_material", "_black_material", "_shared",
+                 "_move_cache")
+
+    def __init__(self, quiet=False, move_cache=None):
+        """
+        Start a new game. move_cache may be a MoveCache shared by many games, which lets moves in positions
+        already seen be accepted with a set lookup.
+        """
+        self._quiet = quiet
+        self._move_cache = move_cache
         self._turn = "WHITE"  # Initialize turn to start with White
         self._game_state = "UNFINISHED"
 
-        # store which pieces have been lost in the game
-        self._white_lost_pieces = []
-        self._black_lost_pieces = []
+        # undo records of the moves made with push(), most recent last
+        self._history = []
+
+        # attack maps of both sides, computed when asked for and kept for the position hash they were made in
+        self._attack_cache = (None, 0, 0)
+
+        # a subclass with its own board_init() builds its own starting position
+        if _STARTING_POSITION is not None and type(self).board_init is ChessVar.board_init:
+            (self._board, self._bitboards, self._white_occupied, self._black_occupied, self._white_material,
+             self._black_material, self._white_lost_pieces, self._black_lost_pieces, self._white_fairy_pieces,
+             self._black_fairy_pieces, self._hash) = _STARTING_POSITION
+            self._shared = True
+            return
+
+        self._board = self.board_init()
+        self.build_bitboards()
+        self.count_material()
+        # True while the board and bitboards may be shared with a snapshot or the starting position; see snapshot()
+        self._shared = False
+
+        # store the codes of the pieces that have been lost in the game; like the fairy pieces below they are
+        # immutable bytes, replaced rather than changed, so games can share them
+        self._white_lost_pieces = b""
+        self._black_lost_pieces = b""
 
-        # list to store the fairy pieces
-        self._white_fairy_pieces = ["F", "H"]
-        self._black_fairy_pieces = ["f", "h"]
+        # store the codes of the fairy pieces not yet entered
+        self._white_fairy_pieces = bytes((WHITE | FALCON, WHITE | HUNTER))
+        self._black_fairy_pieces = bytes((BLACK | FALCON, BLACK | HUNTER))
 
-    # list to store the unicode chess pieces
-    white_piece = ["♚", "♛", "♜", "♝", "♞", "♟︎", "F", "H"]
-    black_piece = ["♔", "♕", "♖", "♗", "♘", "♙", "f", "h"]
-    white_major = ["♚", "♛", "♜", "♝", "♞", "F", "H"]
-    black_major = ["♔", "♕", "♖", "♗", "♘", "f", "h"]
-    kings = ["♔", "♚"]
+        # 64-bit position hash, kept up to date as moves are made
+        self._hash = self.compute_hash()
+
+    def copy_position(self, other):
+        """
+        Make this game's position a copy of other's. Everything is shared with other: the piece lists and the
+        occupancy, material and hash ints are never changed in place, and the board and bitboards are copied
+        by whichever game moves first (copy on write).
+        The move history is not copied, so moves made before cannot be taken back with pop().
+        """
+        other._shared = True
+        self._shared = True
+        self._board = other._board
+        self._bitboards = other._bitboards
+        self._white_occupied = other._white_occupied
+        self._black_occupied = other._black_occupied
+        self._white_material = other._white_material
+        self._black_material = other._black_material
+        self._turn = other._turn
+        self._game_state = other._game_state
+        self._white_lost_pieces = other._white_lost_pieces
+        self._black_lost_pieces = other._black_lost_pieces
+        self._white_fairy_pieces = other._white_fairy_pieces
+        self._black_fairy_pieces = other._black_fairy_pieces
+        self._history = []
+        self._attack_cache = other._attack_cache
+        self._hash = other._hash
+
+    def __getstate__(self):
+        """
+        Return the game's state for pickling and copying, without the move cache, which may be shared by many
+        games; a game read back has no move cache
+        """
+        return {name: getattr(self, name) for name in ChessVar.__slots__ if name != "_move_cache"}
+
+    def __setstate__(self, state):
+        """
+        Restore a game from the state returned by __getstate__()
+        """
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._move_cache = None
+
+    def snapshot(self):
+        """
+        Return a new game in this game's position for exploring a variation, at the cost of an empty object.
+        The child shares the board, bitboards and piece lists with this game; a move copies only the board and
+        bitboards, and a capture or fairy piece entry replaces only the piece list it changes, so a tree of
+        variations grows with the moves made in it. Either game may move on without affecting the other.
+        """
+        child = type(self).__new__(type(self))
+        child._quiet = self._quiet
+        child._move_cache = self._move_cache
+        child.copy_position(self)
+        return child
+
+    def unshare(self):
+        """
+        Give this game its own copy of a board and bitboards shared with a snapshot or the starting position,
+        before changing them
+        """
+        self._board = bytearray(self._board)
+        self._bitboards = list(self._bitboards)
+        self._shared = False
 
     def board_init(self):
         """
-        Methods to initialize the visual board
+        Methods to initialize the board as 64 piece codes
         """
-        board = [["" for row in range(8)] for column in range(8)]
+        board = bytearray(64)
 
         # setting up pawns for black and white
         for col in range(8):
-            board[1][col] = "♙"
-            board[2][col] = "."
-            board[3][col] = "."
-            board[4][col] = "."
-            board[5][col] = "."
-            board[6][col] = "♟︎"
+            board[8 + col] = BLACK | PAWN
+            board[48 + col] = WHITE | PAWN
 
         # adding the major pieces to the board
-        board[0] = ["♖", "♘", "♗", "♔", "♕", "♗", "♘", "♖"]
-        board[7] = ["♜", "♞", "♝", "♚", "♛", "♝", "♞", "♜"]
+        for col, piece_type in enumerate(BACK_RANK):
+            board[col] = BLACK | piece_type
+            board[56 + col] = WHITE | piece_type
         return board
 
-    def get_game_state(self):
+    def build_bitboards(self):
+        """
+        Build the bitboard of every piece code and the occupancy of each side from the board
         """
-        Get the current game state as a string if it is in progress or a player has won.
+        bitboards = [0] * BITBOARD_COUNT
+        for square, piece in enumerate(self._board):
+            if piece != EMPTY:
+                bitboards[BITBOARD_SLOTS[piece]] |= 1 << square
+        self._bitboards = bitboards
+        self.build_occupancy()
+
+    def build_occupancy(self):
         """
+        Build the occupancy of each side from the bitboards
+        """
+        bitboards = self._bitboards
+        self._white_occupied = 0
+        self._black_occupied = 0
+        for piece_type in PIECE_RULES:
+            self._white_occupied |= bitboards[BITBOARD_SLOTS[WHITE | piece_type]]
+            self._black_occupied |= bitboards[BITBOARD_SLOTS[BLACK | piece_type]]
 
-        if self._black_king_lost == True:
-            return "WHITE WINS"
-        if self._white_king_lost == True:
-            return "BLACK WINS"
-        else:
-            return "UNFINISHED"
+    def get_game_state(self):
+        """
+        Get the current game state as a string: 'UNFINISHED' while the game is in progress,
+        'WHITE_WON' or 'BLACK_WON' once a king has been captured or checkmated, or 'DRAW' after a stalemate.
+        """
+        return self._game_state
 
-    def king_status(self):
-        if "♚" in self._white_lost_pieces:
+    def king_status(self, captured):
+        """
+        Update the game state after a capture: taking a king wins the game
+        """
+        if captured == WHITE | KING:
             self._game_state = "BLACK_WON"
-        if "♔" in self._black_lost_pieces:
+        elif captured == BLACK | KING:
             self._game_state = "WHITE_WON"
 
+    def get_material(self, side):
+        """
+        Return the material value of the pieces side ('WHITE' or 'BLACK') has on the board
+        """
+        return self._white_material if side == "WHITE" else self._black_material
+
+    def count_material(self):
+        """
+        Set each side's material counter from the bitboards, which moves otherwise keep up to date
+        """
+        self._white_material = 0
+        self._black_material = 0
+        for piece_type, value in enumerate(PIECE_VALUES):
+            self._white_material += value * self._bitboards[BITBOARD_SLOTS[WHITE | piece_type]].bit_count()
+            self._black_material += value * self._bitboards[BITBOARD_SLOTS[BLACK | piece_type]].bit_count()
+
     def get_board(self):
         """
         Print a visual representation of the board to the console.
         """
 
         board_state = "  a b c d e f g h\n"  # Add column labels
-        for index, row in enumerate(self._board):
-            board_state += f"{8 - index} "  # Add row numbers in reverse order
-            board_state += " ".join(row) + "\n"
+        for row in range(8):
+            board_state += f"{8 - row} "  # Add row numbers in reverse order
+            board_state += " ".join(GLYPHS[code] for code in self._board[row * 8:row * 8 + 8]) + "\n"
         print(board_state)
 
+    def to_notation(self):
+        """
+        Return the whole game position as one line of position notation, which from_notation() reads back
+        """
+        squares = self._board.translate(CODE_LETTERS).decode("ascii")
+        board = "/".join(squares[row:row + 8] for row in range(0, 64, 8))
+        for count in range(8, 0, -1):
+            board = board.replace("." * count, str(count))
+        lost = (self._white_lost_pieces + self._black_lost_pieces).translate(CODE_LETTERS).decode("ascii")
+        reserve = (self._white_fairy_pieces + self._black_fairy_pieces).translate(CODE_LETTERS).decode("ascii")
+        return " ".join((board, "w" if self._turn == "WHITE" else "b", GAME_STATE_NOTATION[self._game_state],
+                         lost or "-", reserve or "-"))
+
+    @classmethod
+    def from_notation(cls, notation, quiet=False, move_cache=None):
+        """
+        Return a new game set up from a line of position notation written by to_notation().
+        Raises ValueError if the notation is malformed.
+        """
+        game = cls.__new__(cls)
+        game._quiet = quiet
+        game._move_cache = move_cache
+        game._history = []
+        game.set_notation(notation)
+        return game
+
+    @classmethod
+    def from_position(cls, position, quiet=False, move_cache=None):
+        """
+        Return a new game set up in the position of a Position, with no moves to take back
+        """
+        game = cls.__new__(cls)
+        game._quiet = quiet
+        game._move_cache = move_cache
+        game.set_position(*position.get_fields(), position.get_hash())
+        return game
+
+    def set_position(self, board, turn, game_state, white_lost, black_lost, white_reserve, black_reserve,
+                     hash_value=None):
+        """
+        Replace the position with the one given as its 64 piece codes, side to move ('WHITE' or 'BLACK'), game state,
+        the codes of each side's lost pieces and the codes of each side's fairy pieces in reserve.
+        hash_value is the position's hash when already known; otherwise it is computed.
+        """
+        self._board = bytearray(board)
+        self.build_bitboards()
+        self.count_material()
+        self._shared = False
+        self._turn = turn
+        self._game_state = game_state
+        self._white_lost_pieces, self._black_lost_pieces = bytes(white_lost), bytes(black_lost)
+        self._white_fairy_pieces, self._black_fairy_pieces = bytes(white_reserve), bytes(black_reserve)
+        self._history = []
+        self._attack_cache = (None, 0, 0)
+        self._hash = self.compute_hash() if hash_value is None else hash_value
+
+    def set_notation(self, notation):
+        """
+        Replace the position with the one described by a line of position notation.
+        Raises ValueError if the notation is malformed, leaving the game unchanged.
+        """
+        fields = notation.split()
+        if len(fields) != 5:
+            raise ValueError(f"position notation needs 5 fields, got {len(fields)}: {notation!r}")
+        board, turn, state, lost, reserve = fields
+
+        squares = board
+        for digit, run in EMPTY_RUNS:
+            squares = squares.replace(digit, run)
+        if len(squares) != EXPANDED_LENGTH or squares[8::9] != "///////" or squares.count("/") != 7:
+            raise ValueError(f"position notation board does not have 8 ranks of 8 squares: {board!r}")
+        codes = squares.replace("/", "").encode("ascii", "replace").translate(NOTATION_CODES)
+        if 0xFF in codes:
+            raise ValueError(f"position notation board has an unknown piece: {board!r}")
+        if turn not in ("w", "b"):
+            raise ValueError(f"position notation side to move must be 'w' or 'b': {turn!r}")
+        if state not in NOTATION_GAME_STATES:
+            raise ValueError(f"position notation game state must be one of {', '.join(NOTATION_GAME_STATES)}: {state!r}")
+
+        white_lost, black_lost = bytearray(), bytearray()
+        for letter in lost if lost != "-" else "":
+            code = LETTER_CODES.get(letter, EMPTY)
+            if not is_major(code):
+                raise ValueError(f"position notation lost pieces must be major pieces: {lost!r}")
+            (white_lost if code & WHITE else black_lost).append(code)
+        white_reserve, black_reserve = bytearray(), bytearray()
+        for letter in reserve if reserve != "-" else "":
+            code = LETTER_CODES.get(letter, EMPTY)
+            side_reserve = white_reserve if code & WHITE else black_reserve
+            if code & TYPE_MASK not in (FALCON, HUNTER) or code in side_reserve:
+                raise ValueError(f"position notation reserve must hold each side's Falcon and Hunter at most once: "
+                                 f"{reserve!r}")
+            side_reserve.append(code)
+
+        # one pass over the board builds the bitboards and the piece part of the hash,
+        # which is what build_bitboards() and compute_hash() would do in two
+        bitboards = [0] * BITBOARD_COUNT
+        position_hash = ZOBRIST_BLACK_TO_MOVE if turn == "b" else 0
+        for square, piece in enumerate(codes):
+            if piece != EMPTY:
+                bitboards[BITBOARD_SLOTS[piece]] |= 1 << square
+                position_hash ^= ZOBRIST_PIECES[piece][square]
+        for piece in white_reserve + black_reserve:
+            position_hash ^= ZOBRIST_RESERVE[piece]
+        position_hash ^= ZOBRIST_LOST[WHITE][min(len(white_lost), 2)] ^ ZOBRIST_LOST[BLACK][min(len(black_lost), 2)]
+
+        self._board = bytearray(codes)
+        self._bitboards = bitboards
+        self.build_occupancy()
+        self.count_material()
+        self._turn = "WHITE" if turn == "w" else "BLACK"
+        self._game_state = NOTATION_GAME_STATES[state]
+        self._shared = False
+        self._white_lost_pieces, self._black_lost_pieces = bytes(white_lost), bytes(black_lost)
+        self._white_fairy_pieces, self._black_fairy_pieces = bytes(white_reserve), bytes(black_reserve)
+        self._history = []
+        self._hash = position_hash
+        self._attack_cache = (None, 0, 0)
+
     def get_turn(self):
         """
         Return which players turn it currently is
@@ -87,25 +745,49 @@ class ChessVar():
         """
         return the major pieces white has lost
         """
-        return self._white_lost_pieces
+        return [GLYPHS[code] for code in self._white_lost_pieces]
 
     def get_black_lost_pieces(self):
         """
         return the major pieces black has lost
         """
-        return self._black_lost_pieces
+        return [GLYPHS[code] for code in self._black_lost_pieces]
 
     def get_rem_white_fairy(self):
         """
         return the remaining fairy pieces for white
         """
-        return self._white_fairy_pieces
+        return [GLYPHS[code] for code in self._white_fairy_pieces]
 
     def get_rem_black_fairy(self):
         """
         return the remaining fairy pieces for black
         """
-        return self._black_fairy_pieces
+        return [GLYPHS[code] for code in self._black_fairy_pieces]
+
+    def get_lost_codes(self, side):
+        """
+        return the piece codes of the major pieces side ('WHITE' or 'BLACK') has lost, as bytes
+        """
+        return self._white_lost_pieces if side == "WHITE" else self._black_lost_pieces
+
+    def get_fairy_codes(self, side):
+        """
+        return the piece codes of the fairy pieces side ('WHITE' or 'BLACK') still holds, as bytes
+        """
+        return self._white_fairy_pieces if side == "WHITE" else self._black_fairy_pieces
+
+    def get_board_codes(self):
+        """
+        return the board as 64 piece codes in a bytes object, indexed by row * 8 + column with row 0 being rank 8
+        """
+        return bytes(self._board)
+
+    def get_occupied(self, side):
+        """
+        return the bitboard of the squares holding a piece of side ('WHITE' or 'BLACK')
+        """
+        return self._white_occupied if side == "WHITE" else self._black_occupied
 
     def switch_turn(self):
         """
@@ -113,773 +795,572 @@ class ChessVar():
         """
 
         self._turn = "BLACK" if self._turn == "WHITE" else "WHITE"
+        self._hash ^= ZOBRIST_BLACK_TO_MOVE
+
+    def get_hash(self):
+        """
+        Return the 64-bit Zobrist hash of the position
+        """
+        return self._hash
+
+    def compute_hash(self):
+        """
+        Compute the position hash from scratch, which get_hash() otherwise keeps up to date move by move
+        """
+        return zobrist_hash(self._board, self._turn, self._white_lost_pieces, self._black_lost_pieces,
+                            self._white_fairy_pieces, self._black_fairy_pieces)
+
+    def record_lost_piece(self, captured_piece):
+        """
+        Append a captured major piece to the lost pieces of its owner
+        """
+        if is_major(captured_piece):
+            if captured_piece & BLACK:
+                color, lost = BLACK, self._black_lost_pieces
+                self._black_lost_pieces = lost + bytes((captured_piece,))
+            else:
+                color, lost = WHITE, self._white_lost_pieces
+                self._white_lost_pieces = lost + bytes((captured_piece,))
+            if len(lost) < 2:
+                self._hash ^= ZOBRIST_LOST[color][len(lost)] ^ ZOBRIST_LOST[color][len(lost) + 1]
 
     def enter_fairy_piece(self, piece, location):
         """
         Enter the fairy piece into the board
         """
-        row, col = self.square_to_coords(location)
-        # Check if the player has lost a major piece (queen, rook, bishop, knight)
-        if (self._turn == "WHITE" and len(self._white_lost_pieces) >= 1) or (self._turn == "BLACK" and len(self._black_lost_pieces) >= 1):
-            # Check if the target location is within the home ranks
-            if (self._turn == "WHITE" and row >= 6) or (self._turn == "BLACK" and row <= 1):
-
-                # Check if piece has entered previously
-                if self._turn == "WHITE" and piece in self._white_fairy_pieces or self._turn == "BLACK" and piece in self._black_fairy_pieces:
-                    # Check if the target location is empty
-                    if self._board[row][col] == ".":
-                        # Place the fairy piece on the target location
-                        self._board[row][col] = piece
-                        # Remove piece from fairy piece list
-                        if self._turn == "WHITE":
-                            self._white_fairy_pieces.remove(piece)
-                        else:
-                            self._black_fairy_pieces.remove(piece)
-                        # Switch turn
-                        self.switch_turn()
-                        return True
+        square = SQUARE_INDEX.get(location)
+        if square is None:
+            return self.move_result(square_status(location))
 
-        if (self._turn == "WHITE" and len(self._white_lost_pieces) >= 2) or (self._turn == "BLACK" and len(self._black_lost_pieces) >= 2):
-            # Check if the target location is within the home ranks
-            if (self._turn == "WHITE" and row >= 6) or (self._turn == "BLACK" and row <= 1):
-                # Check if piece has entered previously
-                if self._turn == "WHITE" and piece in self._white_fairy_pieces or self._turn == "BLACK" and piece in self._black_fairy_pieces:
-                    # Check if the target location is empty
-                    if self._board[row][col] == ".":
-                        # Place the fairy piece on the target location
-                        self._board[row][col] = piece
-                        # Remove piece from fairy piece list
-                        if self._turn == "WHITE":
-                            self._white_fairy_pieces.remove(piece)
-                        else:
-                            self._black_fairy_pieces.remove(piece)
-                        # Switch turn
-                        self.switch_turn()
-                        return True
-        print("Fairy piece cannot enter this location\n")
-        return False
+        status = self.check_drop(GLYPH_CODES.get(piece, EMPTY), square)
+        if status is MoveStatus.OK:
+            self.drop_piece(GLYPH_CODES[piece], square)
+            self.update_game_state()
+        return self.move_result(status)
 
-    def pawn_move(self, start_row, start_col, end_row, end_col):
-        """Checks the validity of a pawn move based on its movement and capture rules. Parameters:
-        start_row: The starting row of the pawn.
-        start_col: The starting column of the pawn.
-        end_row: The ending row of the pawn.
-        end_col: The ending column of the pawn.
-        Returns True if the move is valid and updates the board, False otherwise.
-        """
-
-        piece = self._board[start_row][start_col]
-
-        if not (0 <= start_row < 8) or not (0 <= start_col < 8) or not (0 <= end_row < 8) or not (0 <= end_col < 8):
-            # Check if piece is moving within the limits of the board
-            print("Invalid move: Out of bounds\n")
-            return False
-
-        if abs(start_row - end_row) == 0:
-            # Check if the player is moving the piece or not
-            print("Invalid move: You have to move your piece\n")
-            return False
-
-        if start_col == end_col:
-            if abs(start_row - end_row) == 1:   # The pawn is moving one space forward
-                # if there is a piece in the way return false
-                if self._board[end_row][end_col] != ".":
-                    print("Invalid move: You are trying to capture your piece\n")
-                    return False
-
-                self._board[end_row][end_col] = piece
-                self._board[start_row][start_col] = "."
-                self.switch_turn()
-                return True
+    def check_drop(self, piece, square):
+        """
+        Return the MoveStatus of entering the fairy piece code on square for the side to move, without entering it
+        """
+        if self._game_state != "UNFINISHED":
+            return MoveStatus.GAME_OVER
+        # a cached position answers with a set lookup; other entries get the full check, which also finds out why
+        # an entry is refused
+        if self._move_cache is not None:
+            moves = self._move_cache.get_moves(self)
+            if moves is not None and MOVE_DROP | piece | square << 6 in moves:
+                return MoveStatus.OK
+        if self._turn == "WHITE":
+            lost, reserve, home_rows = self._white_lost_pieces, self._white_fairy_pieces, (6, 7)
+        else:
+            lost, reserve, home_rows = self._black_lost_pieces, self._black_fairy_pieces, (0, 1)
 
-            elif abs(start_row - end_row) == 2:  # The pawn is moving two spaces forward
-                # Check if the intermediate squares are empty
-                if self._board[end_row][end_col] != "." or self._board[end_row - 1][end_col] != ".":
-                    print("Invalid move: There are pieces in the way\n")
-                    return False
-
-                # Verify this is the pawn's first move and can move two squares
-                if piece == "♟︎" and start_row == 6 and self._board[start_row - 2][start_col] == ".":
-                    self._board[end_row][end_col] = piece
-                    self._board[start_row][start_col] = "."
-                    self.switch_turn()
-                    return True
-                elif piece == "♙" and start_row == 1 and self._board[start_row + 2][start_col] == ".":
-                    self._board[end_row][end_col] = piece
-                    self._board[start_row][start_col] = "."
-                    self.switch_turn()
-                    return True
-                else:
-                    print(
-                        "Invalid move: Pawns can only move two squares on their first move\n")
-                    return False
+        # Check if piece has entered previously
+        if piece == EMPTY or piece not in reserve:
+            return MoveStatus.NOT_IN_RESERVE
+        # Check if the player has lost a major piece (queen, rook, bishop, knight)
+        if len(lost) < 1:
+            return MoveStatus.NO_LOST_PIECE
+        # Check if the target location is within the home ranks
+        if square >> 3 not in home_rows:
+            return MoveStatus.NOT_HOME_RANK
+        # Check if the target location is empty
+        if self._board[square] != EMPTY:
+            return MoveStatus.SQUARE_OCCUPIED
+        return MoveStatus.OK
+
+    def move_result(self, status, piece=EMPTY, captured=EMPTY):
+        """
+        Return the outcome of a move. In quiet mode this is a MoveResult with the status and captured piece;
+        otherwise the reason a move failed is printed and True or False is returned.
+        piece is the moving piece, used to explain an illegal pattern.
+        """
+        if self._quiet:
+            return MoveResult(status, GLYPHS[captured] if captured != EMPTY else None)
+        if status is MoveStatus.OK:
+            return True
+        if status is MoveStatus.ILLEGAL_PATTERN:
+            print(PATTERN_MESSAGES[piece & TYPE_MASK])
+        else:
+            print(STATUS_MESSAGES[status])
+        return False
 
+    def bitboard_move(self, start, end):
+        """
+        Validate a move of the piece on the start square to the end square, both board indexes, against the
+        bitboards and make it if it is legal. Returns the outcome as described in move_result().
+        """
+        piece = self._board[start]
+        status = self.check_move(start, end)
+        if status is not MoveStatus.OK:
+            return self.move_result(status, piece)
+        captured = self._board[end]
+        self.move_piece(start, end)
+        self.update_game_state()
+        return self.move_result(status, piece, captured)
+
+    def check_move(self, start, end):
+        """
+        Return the MoveStatus of moving the piece on the start square to the end square for the side to move,
+        without making the move
+        """
+        if self._game_state != "UNFINISHED":
+            return MoveStatus.GAME_OVER
+        # a cached position answers with a set lookup; other moves get the full check, which also finds out why
+        # a move is refused
+        if self._move_cache is not None:
+            moves = self._move_cache.get_moves(self)
+            if moves is not None and start | end << 6 in moves:
+                return MoveStatus.OK
+        piece = self._board[start]
+        if piece == EMPTY:
+            return MoveStatus.NO_PIECE
+        if self._turn == "WHITE":
+            if not piece & WHITE:
+                return MoveStatus.NOT_YOUR_PIECE
+            own, enemies = self._white_occupied, self._black_occupied
+        else:
+            if not piece & BLACK:
+                return MoveStatus.NOT_YOUR_PIECE
+            own, enemies = self._black_occupied, self._white_occupied
+        if start == end:
+            return MoveStatus.NO_MOVEMENT
+
+        end_bit = 1 << end
+        if own & end_bit:
+            return MoveStatus.OWN_PIECE_CAPTURE
+
+        directions = SLIDER_DIRECTION_BITS[piece]
+        if directions:
+            # a slider needs the end square on one of its directions and nothing in between
+            line = start << 6 | end
+            if not directions >> LINE_DIRECTIONS[line] & 1:
+                return MoveStatus.ILLEGAL_PATTERN
+            if BETWEEN_MASKS[line] & (own | enemies):
+                return MoveStatus.BLOCKED
+            return MoveStatus.OK
+
+        if not piece_targets(piece, start, own | enemies, enemies) & end_bit:
+            # tell a blocked path apart from a square the piece can never reach
+            if piece_targets(piece, start, 0, 0) & end_bit:
+                return MoveStatus.BLOCKED
+            return MoveStatus.ILLEGAL_PATTERN
+        return MoveStatus.OK
+
+    def apply_moves(self, moves):
+        """
+        Make a whole sequence of moves without printing anything. moves is a list of moves in coordinate notation
+        such as 'e2e4' and 'F@h2', or of packed move ints, or a string of such moves separated by spaces.
+        Stops at the first illegal move and returns an ApplyResult with the number of moves made, which is
+        the index of the illegal move, and the MoveStatus that rejected it, or MoveStatus.OK if every move was made.
+        A position is only searched for checkmate or stalemate when the move played from it leaves the mover's
+        king attacked, and after the last move: any other move shows the position was not over.
+        """
+        if isinstance(moves, str):
+            moves = moves.split()
+        move_codes = MOVE_CODES
+        # whether the game state of the position reached by the last move is still to be settled
+        unsettled = False
+        for index, move in enumerate(moves):
+            if isinstance(move, str):
+                move = move_codes.get(move)
+                if move is None:
+                    if unsettled:
+                        self.update_game_state()
+                    return ApplyResult(index, MoveStatus.BAD_NOTATION)
+            start = move & 63
+            end = move >> 6 & 63
+            if move & MOVE_DROP:
+                status = self.check_drop(start, end)
             else:
-                return False
-
-        elif abs(start_col - end_col) == 1 and abs(start_row - end_row) == 1:
-            if self._board[end_row][end_col] != ".":
-                if (self._turn == "WHITE" and self._board[end_row][end_col] in self.white_piece) or \
-                        (self._turn == "BLACK" and self._board[end_row][end_col] in self.black_piece):
-                    # check to see if piece is capturing own piece
-
-                    print("Invalid move: You are trying to capture your piece\n")
-                    return False
-
-                captured_piece = self._board[end_row][end_col]
-                if captured_piece in self.black_major:
-                    self._black_lost_pieces.append(captured_piece)
-                elif captured_piece in self.white_major:
-                    self._white_lost_pieces.append(captured_piece)
-
-                self._board[end_row][end_col] = piece
-                self._board[start_row][start_col] = "."
-                self.switch_turn()
-                self.king_status()
-                return True
+                status = self.check_move(start, end)
+            if status is not MoveStatus.OK:
+                if unsettled:
+                    self.update_game_state()
+                    if self._game_state != "UNFINISHED":
+                        status = MoveStatus.GAME_OVER
+                return ApplyResult(index, status)
+
+            if not unsettled:
+                if move & MOVE_DROP:
+                    self.drop_piece(start, end)
+                else:
+                    self.move_piece(start, end)
+                unsettled = True
+                continue
+            color = WHITE if self._turn == "WHITE" else BLACK
+            self.push(move)
+            king = self._bitboards[BITBOARD_SLOTS[color | KING]]
+            if self._game_state == "UNFINISHED" and king and self.is_square_attacked(king.bit_length() - 1, self._turn):
+                # the move leaves the king attacked, so the position before it may have been checkmate or stalemate
+                self.pop()
+                self.update_game_state()
+                if self._game_state != "UNFINISHED":
+                    return ApplyResult(index, MoveStatus.GAME_OVER)
+                self.push(move)
+            del self._history[-1]
+        if unsettled:
+            self.update_game_state()
+        return ApplyResult(len(moves), MoveStatus.OK)
+
+    def move_piece(self, start, end):
+        """
+        Move the piece on the start square to the end square, capturing whatever stands there, and pass the turn
+        """
+        if self._shared:
+            self.unshare()
+        board = self._board
+        bitboards = self._bitboards
+        piece = board[start]
+        captured = board[end]
+        start_bit = 1 << start
+        end_bit = 1 << end
+
+        if captured != EMPTY:
+            bitboards[BITBOARD_SLOTS[captured]] ^= end_bit
+            if captured & WHITE:
+                self._white_occupied ^= end_bit
+                self._white_material -= CODE_VALUES[captured]
             else:
-                print("Invalid move: Pawns can only capture diagonally\n")
-                return False
-        else:
-            print("Invalid move: Pawns can only move forward or capture diagonally\n")
-            return False
-
-    def knight_move(self, start_row, start_col, end_row, end_col):
-        """Checks the validity of a knight move based on its movement and capture rules. Parameters:
-        start_row: The starting row of the knight.
-        start_col: The starting column of the knight.
-        end_row: The ending row of the knight.
-        end_col: The ending column of the knight.
-        Returns True if the move is valid and updates the board, False otherwise.
-        """
-
-        piece = self._board[start_row][start_col]
-
-        if not (0 <= start_row < 8) or not (0 <= start_col < 8) or not (0 <= end_row < 8) or not (0 <= end_col < 8):
-            print("Invalid move: Out of bounds\n")
-            return False
-
-        if abs(start_col - end_col) == 2 and abs(start_row - end_row) == 1 or abs(start_col - end_col) == 1 and abs(start_row - end_row) == 2:
-            if (self._turn == "WHITE" and self._board[end_row][end_col] in self.white_piece) or \
-                    (self._turn == "BLACK" and self._board[end_row][end_col] in self.black_piece):
-                # check to see if piece is capturing own piece
-                print("Invalid move: You are trying to capture your piece\n")
-                return False
-
-            captured_piece = self._board[end_row][end_col]
-            if captured_piece in self.black_major:
-                self._black_lost_pieces.append(captured_piece)
-            elif captured_piece in self.white_major:
-                self._white_lost_pieces.append(captured_piece)
-            self._board[end_row][end_col] = piece
-            self._board[start_row][start_col] = "."
-            self.switch_turn()
-            self.king_status()
-            return True
-
+                self._black_occupied ^= end_bit
+                self._black_material -= CODE_VALUES[captured]
+            self._hash ^= ZOBRIST_PIECES[captured][end]
+            self.record_lost_piece(captured)
+
+        bitboards[BITBOARD_SLOTS[piece]] ^= start_bit | end_bit
+        self._hash ^= ZOBRIST_PIECES[piece][start] ^ ZOBRIST_PIECES[piece][end]
+        if piece & WHITE:
+            self._white_occupied ^= start_bit | end_bit
         else:
-            print("Invalid move: Knights can only move in L-shape\n")
-            return False
-
-    def bishop_move(self, start_row, start_col, end_row, end_col):
-        """
-        Checks the validity of a bishop move based on its movement and capture rules. Parameters:
-        start_row: The starting row of the bishop.
-        start_col: The starting column of the bishop.
-        end_row: The ending row of the bishop.
-        end_col: The ending column of the bishop.
-        Returns True if the move is valid and updates the board, False otherwise.
-        """
-
-        piece = self._board[start_row][start_col]
-
-        if not (0 <= start_row < 8) or not (0 <= start_col < 8) or not (0 <= end_row < 8) or not (0 <= end_col < 8):
-            # Check if piece is moving out of bounds
-            print("Invalid move: Out of bounds\n")
-            return False
-
-        if abs(start_row - end_row) == abs(start_col - end_col):
-            # Check if there are pieces in between the start and end positions
-            row_direction = 1 if end_row > start_row else -1
-            col_direction = 1 if end_col > start_col else -1
-
-            current_row, current_col = start_row + row_direction, start_col + col_direction
-            while current_row != end_row and current_col != end_col:
-                if self._board[current_row][current_col] != ".":
-                    print("Invalid move: There are pieces in the way\n")
-                    return False
-                current_row += row_direction
-                current_col += col_direction
-
-            if (self._turn == "WHITE" and self._board[end_row][end_col] in self.white_piece) or \
-                    (self._turn == "BLACK" and self._board[end_row][end_col] in self.black_piece):
-                # check to see if piece is capturing own piece
-                print("Invalid move: You are trying to capture your piece\n")
-                return False
-
-            captured_piece = self._board[end_row][end_col]
-            if captured_piece in self.black_major:
-                self._black_lost_pieces.append(captured_piece)
-            elif captured_piece in self.white_major:
-                self._white_lost_pieces.append(captured_piece)
-
-            self._board[end_row][end_col] = piece
-            self._board[start_row][start_col] = "."
-            self.switch_turn()
-            self.king_status()
-            return True
+            self._black_occupied ^= start_bit | end_bit
+        board[end] = piece
+        board[start] = EMPTY
+        self.switch_turn()
+        if captured & TYPE_MASK == KING:
+            self.king_status(captured)
 
+    def drop_piece(self, piece, square):
+        """
+        Place a fairy piece from the reserve of the side to move on an empty square and pass the turn
+        """
+        if self._shared:
+            self.unshare()
+        # Place the fairy piece on the target location
+        self._board[square] = piece
+        self._bitboards[BITBOARD_SLOTS[piece]] |= 1 << square
+        self._hash ^= ZOBRIST_PIECES[piece][square] ^ ZOBRIST_RESERVE[piece]
+        # Remove piece from fairy piece list
+        if piece & WHITE:
+            self._white_fairy_pieces = self._white_fairy_pieces.replace(bytes((piece,)), b"", 1)
+            self._white_occupied |= 1 << square
+            self._white_material += CODE_VALUES[piece]
         else:
-            print("Invalid move: Bishops can only move diagonally")
-
-    def rook_move(self, start_row, start_col, end_row, end_col):
-        """
-        Checks the validity of a rook move based on its movement and capture rules. Parameters:
-
-        start_row: The starting row of the rook.
-        start_col: The starting column of the rook.
-        end_row: The ending row of the rook.
-        end_col: The ending column of the rook.
-        Returns True if the move is valid and updates the board, False otherwise.
-        """
-        piece = self._board[start_row][start_col]
-
-        # Bounds checking
-        if not (0 <= start_row < 8) or not (0 <= start_col < 8) or not (0 <= end_row < 8) or not (0 <= end_col < 8):
-            print("Invalid move: Out of bounds\n")
-            return False
-
-        # Moving along ranks or files
-        if abs(start_row - end_row) != 0 and abs(start_col - end_col) != 0:
-            print("Invalid move: Rooks can only move along ranks or files\n")
-            return False
-
-        # Moving horizontally
-        if start_row == end_row:
-            direction = 1 if end_col > start_col else -1
-            current_col = start_col + direction
-            while current_col != end_col:
-                if self._board[start_row][current_col] != ".":
-                    print("Invalid move: There are pieces in the way\n")
-                    return False
-                current_col += direction
-
-        # Moving vertically
-        elif start_col == end_col:
-            direction = 1 if end_row > start_row else -1
-            current_row = start_row + direction
-            while current_row != end_row:
-                if self._board[current_row][start_col] != ".":
-                    print("Invalid move: There are pieces in the way\n")
-                    return False
-                current_row += direction
-
-        # Capture logic
-        if (self._turn == "WHITE" and self._board[end_row][end_col] in self.white_piece) or \
-                (self._turn == "BLACK" and self._board[end_row][end_col] in self.black_piece):
-            print("Invalid move: You are trying to capture your piece\n")
-            return False
-
-        captured_piece = self._board[end_row][end_col]
-        if captured_piece in self.black_major:
-            self._black_lost_pieces.append(captured_piece)
-        elif captured_piece in self.white_major:
-            self._white_lost_pieces.append(captured_piece)
-
-        self._board[end_row][end_col] = piece
-        self._board[start_row][start_col] = "."
+            self._black_fairy_pieces = self._black_fairy_pieces.replace(bytes((piece,)), b"", 1)
+            self._black_occupied |= 1 << square
+            self._black_material += CODE_VALUES[piece]
+        # Switch turn
         self.switch_turn()
-        self.king_status()
-        return True
-
-    def queen_move(self, start_row, start_col, end_row, end_col):
-        """
-            Checks the validity of a queens move based on its movement and capture rules. Parameters:
-
-            start_row: The starting row of the queen.
-            start_col: The starting column of the queen.
-            end_row: The ending row of the queen.
-            end_col: The ending column of the queen.
-            Returns True if the move is valid and updates the board, False otherwise.
-        """
-        piece = self._board[start_row][start_col]
-
-        # Bounds checking
-        if not (0 <= start_row < 8) or not (0 <= start_col < 8) or not (0 <= end_row < 8) or not (0 <= end_col < 8):
-            print("Invalid move: Out of bounds\n")
-            return False
-
-        # Movement rules for queen
-        if abs(start_row - end_row) == abs(start_col - end_col) or start_row == end_row or start_col == end_col:
-
-            if abs(start_row - end_row) == abs(start_col - end_col):
-                # Check if there are pieces in between the start and end positions
-                row_direction = 1 if end_row > start_row else -1
-                col_direction = 1 if end_col > start_col else -1
-
-                current_row, current_col = start_row + row_direction, start_col + col_direction
-                while current_row != end_row and current_col != end_col:
-                    if self._board[current_row][current_col] != ".":
-                        print("Invalid move: There are pieces in the way\n")
-                        return False
-                    current_row += row_direction
-                    current_col += col_direction
-
-            # Moving horizontally
-            elif start_row == end_row:
-                direction = 1 if end_col > start_col else -1
-                current_col = start_col + direction
-                while current_col != end_col:
-                    if self._board[start_row][current_col] != ".":
-                        print("Invalid move: There are pieces in the way\n")
-                        return False
-                    current_col += direction
-
-            # Moving vertically
-            elif start_col == end_col:
-                direction = 1 if end_row > start_row else -1
-                current_row = start_row + direction
-                while current_row != end_row:
-                    if self._board[current_row][start_col] != ".":
-                        print("Invalid move: There are pieces in the way\n")
-                        return False
-                    current_row += direction
-
-            # Capture logic
-            if (self._turn == "WHITE" and self._board[end_row][end_col] in self.white_piece) or \
-                    (self._turn == "BLACK" and self._board[end_row][end_col] in self.black_piece):
-                print("Invalid move: You are trying to capture your piece\n")
-                return False
-
-            # Update board
-            # if major piece append to lost pieces
-            captured_piece = self._board[end_row][end_col]
-            if captured_piece in self.black_major:
-                self._black_lost_pieces.append(captured_piece)
-            elif captured_piece in self.white_major:
-                self._white_lost_pieces.append(captured_piece)
-
-            self._board[end_row][end_col] = piece
-            self._board[start_row][start_col] = "."
-            self.switch_turn()
-            self.king_status()
-            return True
+
+    def push(self, move):
+        """
+        Make a packed move produced by generate_moves() and keep an undo record so pop() can take it back
+        """
+        start = move & 63
+        end = move >> 6 & 63
+        if move & MOVE_DROP:
+            reserve = self._white_fairy_pieces if start & WHITE else self._black_fairy_pieces
+            self._history.append((move, EMPTY, reserve.index(start), self._game_state, self._hash))
+            self.drop_piece(start, end)
         else:
-            print(
-                "Invalid move: Queens can only move diagonally, horizontally or vertically\n")
-            return False
-
-    def king_move(self, start_row, start_col, end_row, end_col):
-        """
-        Checks the validity of a king move based on its movement and capture rules. Parameters:
-
-        start_row: The starting row of the king.
-        start_col: The starting column of the king.
-        end_row: The ending row of the king.
-        end_col: The ending column of the king.
-        Returns True if the move is valid and updates the board, False otherwise.
-        """
-        piece = self._board[start_row][start_col]
-
-        # Bounds checking
-        if not (0 <= start_row < 8) or not (0 <= start_col < 8) or not (0 <= end_row < 8) or not (0 <= end_col < 8):
-            print("Invalid move: Out of bounds\n")
-            return False
-
-        if abs(start_row - end_row) == 0:
-            # Check if the player is moving the piece or not
-            print("Invalid move: You have to move your piece\n")
-            return False
-
-            # Check if the move is within the allowed range for the king
-        if abs(start_row - end_row) <= 1 and abs(start_col - end_col) <= 1:
-            # Check if the
-            if (self._turn == "WHITE" and self._board[end_row][end_col] not in self.white_piece) or \
-                    (self._turn == "BLACK" and self._board[end_row][end_col] not in self.black_piece):
-                # Update board
-                # if major piece append to lost pieces
-                captured_piece = self._board[end_row][end_col]
-                if captured_piece in self.black_major:
-                    self._black_lost_pieces.append(captured_piece)
-                elif captured_piece in self.white_major:
-                    self._white_lost_pieces.append(captured_piece)
-
-                self._board[end_row][end_col] = piece
-                self._board[start_row][start_col] = "."
-                self.switch_turn()
-                self.king_status()
-                return True
+            self._history.append((move, self._board[end], 0, self._game_state, self._hash))
+            self.move_piece(start, end)
+
+    def pop(self):
+        """
+        Take back the last move made with push(), restoring the board, lost pieces, fairy pieces, turn, game state and hash
+        """
+        move, captured, reserve_index, game_state, position_hash = self._history.pop()
+        if self._shared:
+            self.unshare()
+        start = move & 63
+        end = move >> 6 & 63
+        board = self._board
+        bitboards = self._bitboards
+        end_bit = 1 << end
+
+        if move & MOVE_DROP:
+            # the start field holds the fairy piece, which goes back into its reserve
+            board[end] = EMPTY
+            bitboards[BITBOARD_SLOTS[start]] ^= end_bit
+            if start & WHITE:
+                self._white_occupied ^= end_bit
+                reserve = self._white_fairy_pieces
+                self._white_fairy_pieces = reserve[:reserve_index] + bytes((start,)) + reserve[reserve_index:]
+                self._white_material -= CODE_VALUES[start]
             else:
-                print("Invalid move: You cannot capture your own piece\n")
-                return False
+                self._black_occupied ^= end_bit
+                reserve = self._black_fairy_pieces
+                self._black_fairy_pieces = reserve[:reserve_index] + bytes((start,)) + reserve[reserve_index:]
+                self._black_material -= CODE_VALUES[start]
         else:
-            print("Invalid move: Kings can only move one square in any direction\n")
-            return False
-
-    def falcon_move(self, start_row, start_col, end_row, end_col):
-        """
-        Checks the validity of a falcon move based on its movement and capture rules. Parameters:
-
-
-        start_row: The starting row of the falcon.
-        start_col: The starting column of the falcon.
-        end_row: The ending row of the falcon.
-        end_col: The ending column of the falcon.
-        Returns True if the move is valid and updates the board, False otherwise.
-        """
-        piece = self._board[start_row][start_col]
-
-        if not (0 <= start_row < 8) or not (0 <= start_col < 8) or not (0 <= end_row < 8) or not (0 <= end_col < 8):
-            print("Invalid move: Out of bounds\n")
-            return False
-
-        if piece in self.white_piece and self._turn == "WHITE":
-            # Falcon movement for white pieces
-            if end_row > start_row and end_col == start_col:  # Moving vertically
-                for row in range(start_row - 1, end_row, -1):
-                    if self._board[row][start_col] != ".":
-                        print("Invalid move: There are pieces in the way\n")
-                        return False
-
-                if (self._turn == "WHITE" and self._board[end_row][end_col] not in self.white_piece) or \
-                        (self._turn == "BLACK" and self._board[end_row][end_col] not in self.black_piece):
-                    # Update board
-                    # if major piece append to lost pieces
-                    captured_piece = self._board[end_row][end_col]
-                    if captured_piece in self.black_major:
-                        self._black_lost_pieces.append(captured_piece)
-                    elif captured_piece in self.white_major:
-                        self._white_lost_pieces.append(captured_piece)
-
-                    self._board[end_row][end_col] = piece
-                    self._board[start_row][start_col] = "."
-                    self.switch_turn()
-                    self.king_status()
-                    return True
-                else:
-                    print("Invalid move: You cannot capture your own piece\n")
-                    return False
-
-            elif abs(start_row - end_row) == abs(start_col - end_col) and start_row > end_row:
-                if abs(start_row - end_row) == abs(start_col - end_col):
-                    # Check if there are pieces in between the start and end positions
-                    row_direction = 1 if end_row > start_row else -1
-                    col_direction = 1 if end_col > start_col else -1
-
-                    current_row, current_col = start_row + row_direction, start_col + col_direction
-                    while current_row != end_row and current_col != end_col:
-                        if self._board[current_row][current_col] != ".":
-                            print("Invalid move: There are pieces in the way\n")
-                            return False
-                        current_row += row_direction
-                        current_col += col_direction
-
-                if (self._turn == "WHITE" and self._board[end_row][end_col] not in self.white_piece) or \
-                        (self._turn == "BLACK" and self._board[end_row][end_col] not in self.black_piece):
-                    # Update board
-                    # if major piece append to lost pieces
-                    captured_piece = self._board[end_row][end_col]
-                    if captured_piece in self.black_major:
-                        self._black_lost_pieces.append(captured_piece)
-                    elif captured_piece in self.white_major:
-                        self._white_lost_pieces.append(captured_piece)
-
-                    self._board[end_row][end_col] = piece
-                    self._board[start_row][start_col] = "."
-                    self.switch_turn()
-                    self.king_status()
-                    return True
-                else:
-                    print("Invalid move: You are trying to capture your piece\n")
-                    return False
-
-        elif piece in self.black_piece and self._turn == "BLACK":
-            # Falcon movement for black pieces
-            if end_row < start_row and end_col == start_col:  # Moving backwards vertically
-                if (self._turn == "WHITE" and self._board[end_row][end_col] not in self.white_piece) or \
-                        (self._turn == "BLACK" and self._board[end_row][end_col] not in self.black_piece):
-                    # Update board
-                    # if major piece append to lost pieces
-                    captured_piece = self._board[end_row][end_col]
-                    if captured_piece in self.black_major:
-                        self._black_lost_pieces.append(captured_piece)
-                    elif captured_piece in self.white_major:
-                        self._white_lost_pieces.append(captured_piece)
-
-                    self._board[end_row][end_col] = piece
-                    self._board[start_row][start_col] = "."
-                    self.switch_turn()
-                    self.king_status()
-                    return True
-                else:
-                    print("Invalid move: You cannot capture your own piece\n")
-                    return False
-
-            elif abs(start_row - end_row) == abs(start_col - end_col) and start_row < end_row:
-                if abs(start_row - end_row) == abs(start_col - end_col):
-                    # Check if there are pieces in between the start and end positions
-                    row_direction = 1 if end_row > start_row else -1
-                    col_direction = 1 if end_col > start_col else -1
-
-                    current_row, current_col = start_row + row_direction, start_col + col_direction
-                    while current_row != end_row and current_col != end_col:
-                        if self._board[current_row][current_col] != ".":
-                            print("Invalid move: There are pieces in the way\n")
-                            return False
-                        current_row += row_direction
-                        current_col += col_direction
-
-                if (self._turn == "WHITE" and self._board[end_row][end_col] not in self.white_piece) or \
-                        (self._turn == "BLACK" and self._board[end_row][end_col] not in self.black_piece):
-                    # Update board
-                    # if major piece append to lost pieces
-                    captured_piece = self._board[end_row][end_col]
-                    if captured_piece in self.black_major:
-                        self._black_lost_pieces.append(captured_piece)
-                    elif captured_piece in self.white_major:
-                        self._white_lost_pieces.append(captured_piece)
-
-                    self._board[end_row][end_col] = piece
-                    self._board[start_row][start_col] = "."
-                    self.switch_turn()
-                    self.king_status()
-                    return True
+            piece = board[end]
+            start_bit = 1 << start
+            board[start] = piece
+            board[end] = captured
+            bitboards[BITBOARD_SLOTS[piece]] ^= start_bit | end_bit
+            if piece & WHITE:
+                self._white_occupied ^= start_bit | end_bit
+            else:
+                self._black_occupied ^= start_bit | end_bit
+
+            if captured != EMPTY:
+                bitboards[BITBOARD_SLOTS[captured]] ^= end_bit
+                if captured & WHITE:
+                    self._white_occupied ^= end_bit
+                    self._white_material += CODE_VALUES[captured]
+                    if is_major(captured):
+                        self._white_lost_pieces = self._white_lost_pieces[:-1]
                 else:
-                    print("Invalid move: You are trying to capture your piece\n")
-                    return False
+                    self._black_occupied ^= end_bit
+                    self._black_material += CODE_VALUES[captured]
+                    if is_major(captured):
+                        self._black_lost_pieces = self._black_lost_pieces[:-1]
 
-        print("Invalid move: Falcon can only move forward like a Bishop or backward like a rook\n")
-        return False
+        self.switch_turn()
+        self._game_state = game_state
+        self._hash = position_hash
 
-    def hunter_move(self, start_row, start_col, end_row, end_col):
-        """
-        Checks the validity of a hunter move based on its movement and capture rules. Parameters:
-
-        start_row: The starting row of the hunter.
-        start_col: The starting column of the hunter.
-        end_row: The ending row of the hunter.
-        end_col: The ending column of the hunter.
-        Returns True if the move is valid and updates the board, False otherwise.
-        """
-        piece = self._board[start_row][start_col]
-
-        if not (0 <= start_row < 8) or not (0 <= start_col < 8) or not (0 <= end_row < 8) or not (0 <= end_col < 8):
-            print("Invalid move: Out of bounds\n")
-            return False
-
-        if piece in self.white_piece and self._turn == "WHITE":
-            # Hunter movement for white pieces
-            if end_row < start_row and end_col == start_col:  # Moving vertically
-                for row in range(start_row - 1, end_row, -1):
-                    if self._board[row][start_col] != ".":
-                        print("Invalid move: There are pieces in the way\n")
-                        return False
-
-                if (self._turn == "WHITE" and self._board[end_row][end_col] not in self.white_piece) or \
-                        (self._turn == "BLACK" and self._board[end_row][end_col] not in self.black_piece):
-                    # Update board
-                    # if major piece append to lost pieces
-                    captured_piece = self._board[end_row][end_col]
-                    if captured_piece in self.black_major:
-                        self._black_lost_pieces.append(captured_piece)
-                    elif captured_piece in self.white_major:
-                        self._white_lost_pieces.append(captured_piece)
-
-                    self._board[end_row][end_col] = piece
-                    self._board[start_row][start_col] = "."
-                    self.switch_turn()
-                    self.king_status()
-                    return True
-                else:
-                    print("Invalid move: You cannot capture your own piece\n")
-                    return False
-
-            elif abs(start_row - end_row) == abs(start_col - end_col) and start_row < end_row:
-                if abs(start_row - end_row) == abs(start_col - end_col):
-                    # Check if there are pieces in between the start and end positions
-                    row_direction = 1 if end_row > start_row else -1
-                    col_direction = 1 if end_col > start_col else -1
-
-                    current_row, current_col = start_row + row_direction, start_col + col_direction
-                    while current_row != end_row and current_col != end_col:
-                        if self._board[current_row][current_col] != ".":
-                            print("Invalid move: There are pieces in the way\n")
-                            return False
-                        current_row += row_direction
-                        current_col += col_direction
-
-                if (self._turn == "WHITE" and self._board[end_row][end_col] not in self.white_piece) or \
-                        (self._turn == "BLACK" and self._board[end_row][end_col] not in self.black_piece):
-                    # Update board
-                    # if major piece append to lost pieces
-                    captured_piece = self._board[end_row][end_col]
-                    if captured_piece in self.black_major:
-                        self._black_lost_pieces.append(captured_piece)
-                    elif captured_piece in self.white_major:
-                        self._white_lost_pieces.append(captured_piece)
-
-                    self._board[end_row][end_col] = piece
-                    self._board[start_row][start_col] = "."
-                    self.switch_turn()
-                    self.king_status()
-                    return True
-                else:
-                    print("Invalid move: You are trying to capture your piece\n")
-                    return False
-
-        elif piece in self.black_piece and self._turn == "BLACK":
-            # Hunter movement for black pieces
-            if end_row > start_row and end_col == start_col:  # Moving forward vertically
-                if (self._turn == "WHITE" and self._board[end_row][end_col] not in self.white_piece) or \
-                        (self._turn == "BLACK" and self._board[end_row][end_col] not in self.black_piece):
-                    # Update board
-                    # if major piece append to lost pieces
-                    captured_piece = self._board[end_row][end_col]
-                    if captured_piece in self.black_major:
-                        self._black_lost_pieces.append(captured_piece)
-                    elif captured_piece in self.white_major:
-                        self._white_lost_pieces.append(captured_piece)
-
-                    self._board[end_row][end_col] = piece
-                    self._board[start_row][start_col] = "."
-                    self.switch_turn()
-                    self.king_status()
-                    return True
-                else:
-                    print("Invalid move: You cannot capture your own piece\n")
-                    return False
-
-            elif abs(start_row - end_row) == abs(start_col - end_col) and start_row > end_row:
-                if abs(start_row - end_row) == abs(start_col - end_col):
-                    # Check if there are pieces in between the start and end positions
-                    row_direction = 1 if end_row > start_row else -1
-                    col_direction = 1 if end_col > start_col else -1
-
-                    current_row, current_col = start_row + row_direction, start_col + col_direction
-                    while current_row != end_row and current_col != end_col:
-                        if self._board[current_row][current_col] != ".":
-                            print("Invalid move: There are pieces in the way\n")
-                            return False
-                        current_row += row_direction
-                        current_col += col_direction
-
-                if (self._turn == "WHITE" and self._board[end_row][end_col] not in self.white_piece) or \
-                        (self._turn == "BLACK" and self._board[end_row][end_col] not in self.black_piece):
-                    # Update board
-                    # if major piece append to lost pieces
-                    captured_piece = self._board[end_row][end_col]
-                    if captured_piece in self.black_major:
-                        self._black_lost_pieces.append(captured_piece)
-                    elif captured_piece in self.white_major:
-                        self._white_lost_pieces.append(captured_piece)
-
-                    self._board[end_row][end_col] = piece
-                    self._board[start_row][start_col] = "."
-                    self.switch_turn()
-                    self.king_status()
-                    return True
-                else:
-                    print("Invalid move: You are trying to capture your piece\n")
-                    return False
+    def generate_moves(self):
+        """
+        Yield every legal move for the side to move as a packed move int, including fairy piece entries.
+        Moves are produced lazily, so a caller that stops early does not pay for the rest.
+        """
+        if self._game_state != "UNFINISHED":
+            return
 
-        print("Invalid move: Hunter can only move forward like a rook or backward like a bishop\n")
-        return False
+        if self._turn == "WHITE":
+            color, own, enemies = WHITE, self._white_occupied, self._black_occupied
+            lost, reserve = self._white_lost_pieces, self._white_fairy_pieces
+        else:
+            color, own, enemies = BLACK, self._black_occupied, self._white_occupied
+            lost, reserve = self._black_lost_pieces, self._black_fairy_pieces
+        occupied = own | enemies
+        bitboards = self._bitboards
+
+        for piece in PIECE_CODES[color]:
+            pieces = bitboards[BITBOARD_SLOTS[piece]]
+            while pieces:
+                start_bit = pieces & -pieces
+                pieces ^= start_bit
+                start = start_bit.bit_length() - 1
+                targets = piece_targets(piece, start, occupied, enemies) & ~own
+                while targets:
+                    end_bit = targets & -targets
+                    targets ^= end_bit
+                    move = start | (end_bit.bit_length() - 1) << 6
+                    yield move | MOVE_CAPTURE if end_bit & enemies else move
+
+        # a fairy piece may enter any empty home rank square once a major piece is lost
+        if len(lost) >= 1:
+            for piece in reserve:
+                empty = HOME_RANKS[color] & ~occupied
+                while empty:
+                    end_bit = empty & -empty
+                    empty ^= end_bit
+                    yield MOVE_DROP | piece | (end_bit.bit_length() - 1) << 6
 
     def make_move(self, start, end):
         """
-        Choose a square holding a piece using algebraic notation and choose where to move it
+        Choose a square holding a piece using algebraic notation and choose where to move it.
+        Returns True if the move was made and False otherwise, or a MoveResult in quiet mode.
         """
 
-        start_row, start_col = self.square_to_coords(start)
-        end_row, end_col = self.square_to_coords(end)
-        piece = self._board[start_row][start_col]
+        start_square = SQUARE_INDEX.get(start)
+        if start_square is None:
+            return self.move_result(square_status(start))
+        piece = self._board[start_square]
         if self._game_state != "UNFINISHED":
-            print(self.get_game_state())
-
-        if piece == ".":
-            print("There is no piece on this square\n")
-            return False
-
-        if self._turn == "WHITE" and piece in self.black_piece:
-            print("Invalid move: This is not your piece\n")
-            return False
-
-        elif self._turn == "BLACK" and piece in self.white_piece:
-            print("Invalid move: This is not your piece\n")
-            return False
-
-        elif piece in self.white_piece and self._turn == "WHITE":
-            if piece == "♟︎":
-                self.pawn_move(start_row, start_col, end_row, end_col)
+            return self.move_result(MoveStatus.GAME_OVER)
 
-            elif piece == "♞":
-                self.knight_move(start_row, start_col, end_row, end_col)
+        if piece == EMPTY:
+            return self.move_result(MoveStatus.NO_PIECE)
 
-            elif piece == "♝":
-                self.bishop_move(start_row, start_col, end_row, end_col)
+        if not piece & (WHITE if self._turn == "WHITE" else BLACK):
+            return self.move_result(MoveStatus.NOT_YOUR_PIECE)
 
-            elif piece == "♜":
-                self.rook_move(start_row, start_col, end_row, end_col)
+        end_square = SQUARE_INDEX.get(end)
+        if end_square is None:
+            return self.move_result(square_status(end))
 
-            elif piece == "♛":
-                self.queen_move(start_row, start_col, end_row, end_col)
+        # every piece is validated from the tables compiled out of PIECE_RULES for its code
+        return self.bitboard_move(start_square, end_square)
 
-            elif piece == "♚":
-                self.king_move(start_row, start_col, end_row, end_col)
-
-            elif piece == "F":
-                self.falcon_move(start_row, start_col, end_row, end_col)
-
-            elif piece == "H":
-                self.hunter_move(start_row, start_col, end_row, end_col)
-
-            else:
-                print("Invalid move\n")
-                return False
-
-        elif piece in self.black_piece and self._turn == "BLACK":
-            if piece == "♙":
-                self.pawn_move(start_row, start_col, end_row, end_col)
-
-            elif piece == "♘":
-                self.knight_move(start_row, start_col, end_row, end_col)
-
-            elif piece == "♗":
-                self.bishop_move(start_row, start_col, end_row, end_col)
-
-            elif piece == "♖":
-                self.rook_move(start_row, start_col, end_row, end_col)
-
-            elif piece == "♕":
-                self.queen_move(start_row, start_col, end_row, end_col)
-
-            elif piece == "♔":
-                self.king_move(start_row, start_col, end_row, end_col)
+    def update_game_state(self):
+        """
+        Update game state based on the current board state: when the side to move cannot make a move that keeps
+        its king safe, the game is won by the other side if the king is in check (checkmate) and drawn if not
+        (stalemate). Called after every move made with make_move(), enter_fairy_piece() or apply_moves();
+        push() and pop() leave the game state to the search.
+        """
+        if self._game_state != "UNFINISHED":
+            return
+        if self._move_cache is not None:
+            entry = self._move_cache.get_entry(self)
+            if entry is not None:
+                self._game_state = entry.state
+                return
+        self._game_state = self.find_game_state()
+
+    def find_game_state(self):
+        """
+        Return the game state the position of an unfinished game is in: 'UNFINISHED' while the side to move has
+        a move that keeps its king safe, else the other side's win if the king is in check and 'DRAW' if not
+        """
+        checkers = self.get_checkers()
+        if self.has_safe_move(checkers):
+            return "UNFINISHED"
+        if checkers:
+            return "BLACK_WON" if self._turn == "WHITE" else "WHITE_WON"
+        return "DRAW"
 
-            elif piece == "f":
-                self.falcon_move(start_row, start_col, end_row, end_col)
+    def has_safe_move(self, checkers=None):
+        """
+        Return True if the side to move has a move after which its king is not attacked, or that takes the other king.
+        checkers is the bitboard of pieces attacking the king, as returned by get_checkers(), if already known.
+        Moves that cannot matter are judged without being made: out of check a fairy piece entry, or a move by
+        a piece that shares no line with the king, cannot expose the king and is safe, while in check a move other
+        than a king move has to capture the only checker, step in between or take the other king.
+        """
+        color = WHITE if self._turn == "WHITE" else BLACK
+        king = self._bitboards[BITBOARD_SLOTS[color | KING]]
+        if not king:
+            return True
+        king_square = king.bit_length() - 1
+        king_line = king_square << 6
+        if checkers is None:
+            checkers = self.get_checkers()
+        if checkers:
+            evasions = self._bitboards[BITBOARD_SLOTS[(BLACK if color == WHITE else WHITE) | KING]]
+            if not checkers & (checkers - 1):
+                evasions |= checkers | BETWEEN_MASKS[king_line | checkers.bit_length() - 1]
+
+        for move in self.generate_moves():
+            if move & MOVE_DROP or move & 63 != king_square:
+                if not checkers:
+                    if move & MOVE_DROP or LINE_DIRECTIONS[king_line | move & 63] == NO_DIRECTION:
+                        return True
+                elif not evasions >> (move >> 6 & 63) & 1:
+                    continue
+            self.push(move)
+            king = self._bitboards[BITBOARD_SLOTS[color | KING]]
+            safe = self._game_state != "UNFINISHED" or not self.is_square_attacked(king.bit_length() - 1, self._turn)
+            self.pop()
+            if safe:
+                return True
+        return False
 
-            elif piece == "h":
-                self.hunter_move(start_row, start_col, end_row, end_col)
+    def get_checkers(self):
+        """
+        Return the bitboard of the pieces attacking the king of the side to move
+        """
+        if self._turn == "WHITE":
+            king, side = self._bitboards[BITBOARD_SLOTS[WHITE | KING]], "BLACK"
+        else:
+            king, side = self._bitboards[BITBOARD_SLOTS[BLACK | KING]], "WHITE"
+        return self.get_attackers(king.bit_length() - 1, side) if king else 0
 
-            else:
-                print("Invalid move\n")
-                return False
+    def in_check(self):
+        """
+        Return True if the king of the side to move is attacked
+        """
+        if self._turn == "WHITE":
+            king, side = self._bitboards[BITBOARD_SLOTS[WHITE | KING]], "BLACK"
+        else:
+            king, side = self._bitboards[BITBOARD_SLOTS[BLACK | KING]], "WHITE"
+        return king != 0 and self.is_square_attacked(king.bit_length() - 1, side)
 
-    def update_game_state(self):
+    def is_square_attacked(self, square, side):
         """
-        Update game state based on the current board state
+        Return True if a piece of side ('WHITE' or 'BLACK') attacks the square, given as a board index or a name
+        such as 'e4'. It looks outwards from the square for each kind of attacker instead of scanning the board.
         """
+        if isinstance(square, str):
+            square = SQUARE_INDEX[square]
+        bitboards = self._bitboards
+        color, other = (WHITE, BLACK) if side == "WHITE" else (BLACK, WHITE)
+        if PAWN_ATTACKS[other][square] & bitboards[BITBOARD_SLOTS[color | PAWN]]:
+            return True
+        for reverse_attacks, slot in LEAPERS[color]:
+            if reverse_attacks[square] & bitboards[slot]:
+                return True
+        occupied = self._white_occupied | self._black_occupied
+        for direction, slots in enumerate(SLIDERS_FROM[color]):
+            attackers = 0
+            for slot in slots:
+                attackers |= bitboards[slot]
+            # only look along the ray when a slider that could attack from there stands on it
+            if attackers & RAY_MASKS[direction][square] and ray_attacks(direction, square, occupied) & attackers:
+                return True
+        return False
 
-        pass
+    def get_attackers(self, square, side):
+        """
+        Return the bitboard of the pieces of side ('WHITE' or 'BLACK') that attack the square, given as a board index
+        """
+        bitboards = self._bitboards
+        color, other = (WHITE, BLACK) if side == "WHITE" else (BLACK, WHITE)
+        attackers = PAWN_ATTACKS[other][square] & bitboards[BITBOARD_SLOTS[color | PAWN]]
+        for reverse_attacks, slot in LEAPERS[color]:
+            attackers |= reverse_attacks[square] & bitboards[slot]
+        occupied = self._white_occupied | self._black_occupied
+        for direction, slots in enumerate(SLIDERS_FROM[color]):
+            sliders = 0
+            for slot in slots:
+                sliders |= bitboards[slot]
+            if sliders & RAY_MASKS[direction][square]:
+                attackers |= ray_attacks(direction, square, occupied) & sliders
+        return attackers
+
+    def get_attack_map(self, side):
+        """
+        Return the bitboard of every square a piece of side ('WHITE' or 'BLACK') attacks.
+        The maps of both sides are computed together and kept until the position changes.
+        """
+        if self._attack_cache[0] != self._hash:
+            occupied = self._white_occupied | self._black_occupied
+            maps = []
+            for color in (WHITE, BLACK):
+                attacks = 0
+                for piece in PIECE_CODES[color]:
+                    pieces = self._bitboards[BITBOARD_SLOTS[piece]]
+                    while pieces:
+                        piece_bit = pieces & -pieces
+                        pieces ^= piece_bit
+                        square = piece_bit.bit_length() - 1
+                        if piece & TYPE_MASK == PAWN:
+                            attacks |= PAWN_ATTACKS[color][square]
+                        else:
+                            attacks |= piece_targets(piece, square, occupied, 0)
+                maps.append(attacks)
+            self._attack_cache = (self._hash, maps[0], maps[1])
+        return self._attack_cache[1] if side == "WHITE" else self._attack_cache[2]
 
     def square_to_coords(self, square):
         """
-        Convert chess square notation (e.g., 'a1') to coordinates (row, column)
+        Convert chess square notation (e.g., 'a1') to coordinates (row, column).
+        Raises ValueError if square is not the name of a square on the board.
         """
-        col = ord(square[0]) - ord('a')
-        row = 8 - int(square[1])
-        return row, col
+        index = SQUARE_INDEX.get(square)
+        if index is None:
+            raise ValueError(f"not a square: {square!r}")
+        return divmod(index, 8)
+
+
+_start = ChessVar(quiet=True)
+_STARTING_POSITION = (bytes(_start._board), tuple(_start._bitboards), _start._white_occupied, _start._black_occupied,
+                      _start._white_material, _start._black_material, _start._white_lost_pieces,
+                      _start._black_lost_pieces, _start._white_fairy_pieces, _start._black_fairy_pieces, _start._hash)
+del _start
 
 
 def main():
@@ -0,0 +1,287 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+from collections import namedtuple
+
+from ChessVar import GAME_STATE_NOTATION, MOVE_CAPTURE, NOTATION_GAME_STATES, move_to_str, str_to_move
+
+# An archive is a file header, the games one after another and, once the writer
+# is closed, a sparse index with a trailer pointing at it. Every game is a small
+# fixed header with its move count and result, followed by its moves packed into
+# two bytes each exactly as generate_moves() packs them: bits 0-5 the start
+# square, bits 6-11 the end square and MOVE_DROP for a fairy piece entry.
+# All numbers are little endian.
+FILE_MAGIC = b"CVGR"
+INDEX_MAGIC = b"CVIX"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sHH")  # magic, version, index interval
+GAME_HEADER = struct.Struct("<HB")  # move count, result
+TRAILER = struct.Struct("<QQ4s")  # index offset, game count, magic
+INDEX_ENTRY = struct.Struct("<Q")
+
+# files in a directory that are read as games
+ARCHIVE_SUFFIX = ".cvr"
+TEXT_SUFFIX = ".txt"
+# the offset of every this many games is kept in the index
+INDEX_INTERVAL = 1024
+MAX_MOVES = 0xFFFF
+# game states in the order of their result codes
+RESULTS = ("UNFINISHED", "WHITE_WON", "BLACK_WON", "DRAW")
+RESULT_CODES = {state: code for code, state in enumerate(RESULTS)}
+
+GameRecord = namedtuple("GameRecord", "moves result")
+# a game read from a file: where it came from, its moves and the recorded result, or None if unknown
+GameInput = namedtuple("GameInput", "source number moves expected")
+
+
+class RecordWriter():
+    """
+    Class that streams games into a binary game archive.
+    Games are written as they come, so an archive of any size can be written with little memory.
+    close() adds the sparse index that lets RecordReader jump to any game; use the writer as a context manager
+    to have it called.
+    """
+
+    def __init__(self, path, index_interval=INDEX_INTERVAL):
+        self._file = open(path, "wb")
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, VERSION, index_interval))
+        self._interval = index_interval
+        self._offset = FILE_HEADER.size
+        self._offsets = []
+        self._count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_game(self, moves, result="UNFINISHED"):
+        """
+        Append a game given as its moves, either packed move ints or coordinate notation strings such as
+        'e2e4' and 'F@h2', and its final game state
+        """
+        moves = [str_to_move(move) if isinstance(move, str) else move & ~MOVE_CAPTURE for move in moves]
+        if len(moves) > MAX_MOVES:
+            raise ValueError(f"a game record holds at most {MAX_MOVES} moves, got {len(moves)}")
+        if self._count % self._interval == 0:
+            self._offsets.append(self._offset)
+        data = GAME_HEADER.pack(len(moves), RESULT_CODES[result]) + struct.pack(f"<{len(moves)}H", *moves)
+        self._file.write(data)
+        self._offset += len(data)
+        self._count += 1
+
+    def get_count(self):
+        """
+        return the number of games written so far
+        """
+        return self._count
+
+    def close(self):
+        """
+        Write the index and trailer and close the file
+        """
+        if self._file.closed:
+            return
+        self._file.write(struct.pack(f"<{len(self._offsets)}Q", *self._offsets))
+        self._file.write(TRAILER.pack(self._offset, self._count, INDEX_MAGIC))
+        self._file.close()
+
+
+class RecordReader():
+    """
+    Class that reads a binary game archive through mmap, so archives larger than memory can be read.
+    Iterating over the reader yields a GameRecord for every game in order; get_game(n) jumps to game n
+    with the sparse index. An archive whose writer was never closed has no index; it can still be iterated,
+    and the index is rebuilt by a scan the first time a game is looked up.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._interval = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path} is not a game archive")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported archive version {version}")
+
+        self._end = len(self._map)
+        self._count = None
+        self._offsets = None
+        if self._end >= FILE_HEADER.size + TRAILER.size:
+            index_offset, count, magic = TRAILER.unpack_from(self._map, self._end - TRAILER.size)
+            entries = -(-count // self._interval)
+            if magic == INDEX_MAGIC and index_offset + entries * INDEX_ENTRY.size + TRAILER.size == self._end:
+                self._end = index_offset
+                self._count = count
+                self._offsets = list(struct.unpack_from(f"<{entries}Q", self._map, index_offset))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        return self.games()
+
+    def __len__(self):
+        if self._count is None:
+            self.build_index()
+        return self._count
+
+    def close(self):
+        """
+        Release the memory map
+        """
+        self._map.close()
+
+    def games(self, start=0):
+        """
+        Yield a GameRecord for every game from game number start to the end of the archive
+        """
+        offset, skip = self.find_offset(start)
+        data = self._map
+        end = self._end
+        while offset < end:
+            count, result = GAME_HEADER.unpack_from(data, offset)
+            offset += GAME_HEADER.size
+            if skip:
+                skip -= 1
+            else:
+                moves = list(struct.unpack_from(f"<{count}H", data, offset))
+                yield GameRecord(moves, RESULTS[result])
+            offset += 2 * count
+
+    def get_game(self, number):
+        """
+        Return the GameRecord of game number, counting from 0
+        """
+        if not 0 <= number < len(self):
+            raise IndexError(f"game {number} is not in the archive of {len(self)} games")
+        return next(self.games(number))
+
+    def find_offset(self, number):
+        """
+        Return the offset of the nearest indexed game at or before game number and how many games lie between them
+        """
+        if number == 0:
+            return FILE_HEADER.size, 0
+        if self._offsets is None:
+            self.build_index()
+        block = min(number // self._interval, len(self._offsets) - 1)
+        return self._offsets[block], number - block * self._interval
+
+    def build_index(self):
+        """
+        Scan the archive to rebuild the index of an archive without one
+        """
+        offsets = []
+        count = 0
+        offset = FILE_HEADER.size
+        while offset < self._end:
+            if count % self._interval == 0:
+                offsets.append(offset)
+            offset += GAME_HEADER.size + 2 * GAME_HEADER.unpack_from(self._map, offset)[0]
+            count += 1
+        self._offsets = offsets or [FILE_HEADER.size]
+        self._count = count
+
+
+def parse_game_line(line):
+    """
+    Return (moves, result) for a line of text holding the moves of one game in coordinate notation,
+    optionally followed by the result as written in position notation (*, 1-0, 0-1 or 1/2-1/2).
+    result is None when the line does not give one, and the whole return value is None for a blank line.
+    """
+    moves = line.split()
+    if not moves:
+        return None
+    result = None
+    if moves[-1] in NOTATION_GAME_STATES:
+        result = NOTATION_GAME_STATES[moves.pop()]
+    return moves, result
+
+
+def read_file(path):
+    """
+    Yield a GameInput for every game in a file, which is either a binary archive or text with one game per line
+    """
+    with open(path, "rb") as file:
+        is_archive = file.read(len(FILE_MAGIC)) == FILE_MAGIC
+    if is_archive:
+        with RecordReader(path) as reader:
+            for number, record in enumerate(reader):
+                yield GameInput(path, number, record.moves, record.result)
+    else:
+        with open(path) as file:
+            yield from read_text(path, file)
+
+
+def read_text(source, file):
+    """
+    Yield a GameInput for every line of text holding a game
+    """
+    number = 0
+    for line in file:
+        game = parse_game_line(line)
+        if game is not None:
+            yield GameInput(source, number, *game)
+            number += 1
+
+
+def read_games(paths):
+    """
+    Yield a GameInput for every game in the given paths. A directory stands for the archives and text files in it,
+    and '-' reads text from standard input.
+    """
+    for path in paths:
+        if path == "-":
+            yield from read_text("<stdin>", sys.stdin)
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith((ARCHIVE_SUFFIX, TEXT_SUFFIX)):
+                    yield from read_file(os.path.join(path, name))
+        else:
+            yield from read_file(path)
+
+
+def pack_text(text_path, archive_path):
+    """
+    Convert a text file with one game per line, as read by parse_game_line(), into a binary archive.
+    Games without a result are stored as unfinished. Returns the number of games written.
+    """
+    with open(text_path) as text, RecordWriter(archive_path) as writer:
+        for line in text:
+            game = parse_game_line(line)
+            if game is not None:
+                moves, result = game
+                writer.write_game(moves, result or "UNFINISHED")
+        return writer.get_count()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write and read binary ChessVar game archives.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="convert a text file of games, one per line, into an archive")
+    pack.add_argument("text", help="text file with the moves of one game per line")
+    pack.add_argument("archive", help="archive file to write")
+    show = commands.add_parser("show", help="print the games in an archive as text")
+    show.add_argument("archive", help="archive file to read")
+    show.add_argument("-g", "--game", type=int, help="print only this game, counting from 0")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        print(f"{pack_text(args.text, args.archive)} games written")
+        return
+
+    with RecordReader(args.archive) as reader:
+        games = [reader.get_game(args.game)] if args.game is not None else reader
+        for record in games:
+            print(" ".join([move_to_str(move) for move in record.moves] + [GAME_STATE_NOTATION[record.result]]))
+
+
+if __name__ == "__main__":
+    main()
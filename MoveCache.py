@@ -0,0 +1,135 @@
+import argparse
+import time
+from collections import OrderedDict, namedtuple
+
+from ChessVar import MOVE_CAPTURE, ChessVar
+from GameRecord import read_games
+
+# positions kept by default; an entry takes about 2 KB, most of it the set of moves
+DEFAULT_CAPACITY = 20000
+
+# what is cached for a position: the frozenset of its packed legal moves and the game state it is in
+MoveEntry = namedtuple("MoveEntry", "moves state")
+
+
+class MoveCache():
+    """
+    Class representing a size-bounded cache of the legal moves of positions, keyed by the 64-bit position hash.
+    Each entry holds the frozenset of the packed moves generate_moves() yields in the position, without the capture
+    flag, so fairy piece entries are in it exactly when they are allowed, and the game state the position is in.
+    One cache can be shared by any number of games, passed as ChessVar(move_cache=cache): their move checks then
+    accept a move found in the set without validating it again, and the checkmate and stalemate test reads the
+    cached state instead of trying moves.
+    Every move check looks its position up once, and that lookup is what the hit and miss counters count.
+    Generating every move costs far more than checking one, so a position is only cached the second time a move
+    is checked in it, the starting position included; the first time only its hash is remembered. When the cache
+    is full the least recently used position is evicted.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._entries = OrderedDict()
+        self._capacity = capacity
+
+        # statistics
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_capacity(self):
+        """
+        return the number of positions the cache holds at most
+        """
+        return self._capacity
+
+    def get_entry(self, game):
+        """
+        Return the MoveEntry of the game's position, or None if it is not cached. This only looks, so it neither
+        caches the position nor counts as a hit or miss.
+        """
+        return self._entries.get(game.get_hash())
+
+    def get_moves(self, game):
+        """
+        Return the frozenset of packed legal moves in the game's position, a move being checked in it, or None if
+        the position is not cached. A position seen for the second time is cached now; one seen for the first time
+        is remembered.
+        """
+        key = game.get_hash()
+        entries = self._entries
+        if key in entries:
+            entries.move_to_end(key)
+            entry = entries[key]
+            if entry is not None:
+                self._hits += 1
+                return entry.moves
+            self._misses += 1
+            entry = entries[key] = MoveEntry(frozenset(move & ~MOVE_CAPTURE for move in game.generate_moves()),
+                                             game.find_game_state())
+            return entry.moves
+
+        self._misses += 1
+        entries[key] = None
+        if len(entries) > self._capacity:
+            entries.popitem(last=False)
+            self._evictions += 1
+        return None
+
+    def clear(self):
+        """
+        Empty the cache and reset its statistics
+        """
+        self._entries.clear()
+        self._hits = self._misses = self._evictions = 0
+
+    def get_stats(self):
+        """
+        Return a dict with the lookups, hits, misses, hit rate, evictions and the number of positions held
+        """
+        lookups = self._hits + self._misses
+        return {
+            "lookups": lookups,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "positions": len(self._entries),
+        }
+
+
+def replay(games, move_cache=None):
+    """
+    Replay the games, an iterable of GameInputs, with apply_moves() and return the number of moves made
+    """
+    moves = 0
+    for record in games:
+        moves += ChessVar(quiet=True, move_cache=move_cache).apply_moves(record.moves).applied
+    return moves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded games with and without a shared legal-move cache.")
+    parser.add_argument("paths", nargs="+", help="game archives, text files with one game per line, or directories")
+    parser.add_argument("-c", "--capacity", type=int, default=DEFAULT_CAPACITY,
+                        help=f"positions the cache holds (default {DEFAULT_CAPACITY})")
+    args = parser.parse_args()
+
+    games = list(read_games(args.paths))
+    start = time.perf_counter()
+    moves = replay(games)
+    plain_seconds = time.perf_counter() - start
+    cache = MoveCache(args.capacity)
+    start = time.perf_counter()
+    replay(games, cache)
+    cached_seconds = time.perf_counter() - start
+
+    stats = cache.get_stats()
+    print(f"{len(games)} games  {moves} moves  without cache {plain_seconds:.3f}s  with cache {cached_seconds:.3f}s")
+    print(f"hits {stats['hits']}  misses {stats['misses']}  hit rate {stats['hit_rate']:.1%}  "
+          f"evictions {stats['evictions']}  positions {stats['positions']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import argparse
+import multiprocessing
+import os
+import pickle
+import time
+
+from ChessPerft import setup_position
+from ChessSearch import (DEFAULT_TABLE_MB, INFINITY, MATE_SCORE, MAX_PLY, ChessSearch, SearchResult,
+                         SearchTimeout, print_result)
+from TranspositionTable import TranspositionTable
+
+# the transposition table of a worker process, set up by init_worker()
+worker_table = None
+
+
+def init_worker(buffer, size_mb):
+    """
+    Attach a worker process to the transposition table in shared memory
+    """
+    global worker_table
+    worker_table = TranspositionTable(size_mb, buffer)
+
+
+def search_root_move(task):
+    """
+    Score one root move in a worker process.
+    task is (pickled game, move, depth, alpha, deadline, table age), with deadline a time.time() value or None.
+    Returns (move, score, nodes), where score is None if the deadline passed first.
+    """
+    state, move, depth, alpha, deadline, age = task
+    max_time = None
+    if deadline is not None:
+        max_time = deadline - time.time()
+        if max_time <= 0:
+            return move, None, 0
+
+    worker_table.set_age(age)
+    searcher = ChessSearch(pickle.loads(state), worker_table)
+    try:
+        score = searcher.score_move(move, depth, alpha, INFINITY, max_time)
+    except SearchTimeout:
+        score = None
+    return move, score, searcher.get_nodes()
+
+
+class ParallelSearch():
+    """
+    Class that spreads the search of a ChessVar position over a pool of worker processes.
+    Each iteration of the iterative deepening first searches the best move of the previous iteration to get a bound,
+    then hands the remaining root moves to the workers, which search them against that bound.
+    The workers share one transposition table in shared memory, so work done on one root move helps the others.
+    Use it as a context manager, or call close() when done, to shut the pool down.
+    """
+
+    def __init__(self, workers=None, size_mb=DEFAULT_TABLE_MB):
+        self._workers = workers or os.cpu_count()
+        self._buffer = multiprocessing.RawArray("B", size_mb * 1024 * 1024)
+        self._table = TranspositionTable(size_mb, self._buffer)
+        self._pool = multiprocessing.Pool(self._workers, init_worker, (self._buffer, size_mb))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Shut down the worker processes
+        """
+        self._pool.close()
+        self._pool.join()
+
+    def get_workers(self):
+        """
+        return the number of worker processes
+        """
+        return self._workers
+
+    def get_table(self):
+        """
+        Return the transposition table shared by the workers
+        """
+        return self._table
+
+    def search(self, game, max_time=None, max_depth=MAX_PLY, report=None):
+        """
+        Search the game's position and return a SearchResult, like ChessSearch.search().
+        The nodes count the work of every worker. The game itself is not changed.
+        """
+        start_time = time.perf_counter()
+        deadline = time.time() + max_time if max_time is not None else None
+        self._table.new_search()
+        age = self._table.get_age()
+        state = pickle.dumps(game)
+
+        moves = ChessSearch(game, self._table).order_moves(game.generate_moves())
+        best_move, best_score, finished_depth = (moves[0] if moves else None), 0, 0
+        nodes = 0
+
+        for depth in range(1, max_depth + 1):
+            if not moves:
+                break
+            # the first move sets the bound the others are searched against
+            move, alpha, searched = self._pool.apply(search_root_move,
+                                                     ((state, moves[0], depth, -INFINITY, deadline, age),))
+            nodes += searched
+            if alpha is None:
+                break
+
+            scores = {move: alpha}
+            timed_out = False
+            tasks = [(state, move, depth, alpha, deadline, age) for move in moves[1:]]
+            for move, score, searched in self._pool.imap_unordered(search_root_move, tasks):
+                nodes += searched
+                if score is None:
+                    timed_out = True
+                else:
+                    scores[move] = score
+            if timed_out:
+                break
+
+            # moves that fail to beat the bound keep their order behind the best one
+            moves.sort(key=lambda move: -scores[move] if scores[move] > alpha else -alpha)
+            best_move, best_score, finished_depth = moves[0], scores[moves[0]], depth
+            if report is not None:
+                report(self.result(best_move, best_score, finished_depth, nodes, start_time))
+            if abs(best_score) >= MATE_SCORE - MAX_PLY:
+                break
+
+        return self.result(best_move, best_score, finished_depth, nodes, start_time)
+
+    def result(self, move, score, depth, nodes, start_time):
+        """
+        Build a SearchResult for the search started at start_time
+        """
+        seconds = time.perf_counter() - start_time
+        rate = nodes / seconds if seconds > 0 else 0.0
+        return SearchResult(move, score, depth, nodes, seconds, rate)
+
+
+def measure_speedup(game, depth, workers, size_mb=DEFAULT_TABLE_MB):
+    """
+    Search the game's position to depth with one worker and then with workers workers, each with an empty table.
+    Returns (seconds with one worker, seconds with workers workers, speedup).
+    """
+    seconds = []
+    for count in (1, workers):
+        with ParallelSearch(count, size_mb) as search:
+            seconds.append(search.search(game, max_depth=depth).seconds)
+    return seconds[0], seconds[1], seconds[0] / seconds[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search a ChessVar position with several worker processes.")
+    parser.add_argument("-m", "--moves", default="", help="space separated moves leading to the position to search")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default one per core)")
+    parser.add_argument("-t", "--time", type=float, default=1.0, help="seconds to search (default 1.0)")
+    parser.add_argument("-d", "--depth", type=int, default=MAX_PLY, help="maximum depth to search")
+    parser.add_argument("--hash", type=int, default=DEFAULT_TABLE_MB,
+                        help=f"shared transposition table size in megabytes (default {DEFAULT_TABLE_MB})")
+    parser.add_argument("--speedup", type=int, metavar="DEPTH",
+                        help="instead of searching, time a search to DEPTH with one worker and with all of them")
+    args = parser.parse_args()
+
+    game = setup_position(args.moves)
+    if args.speedup is not None:
+        single, parallel, speedup = measure_speedup(game, args.speedup, args.workers, args.hash)
+        print(f"depth {args.speedup}  1 worker {single:.3f}s  {args.workers} workers {parallel:.3f}s  "
+              f"speedup {speedup:.2f}x")
+        return
+
+    with ParallelSearch(args.workers, args.hash) as search:
+        result = search.search(game, args.time, args.depth, report=print_result)
+    print("best", end=" ")
+    print_result(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import time
+import weakref
+
+from ChessVar import ChessVar, zobrist_hash
+from GameRecord import read_games
+
+# every live Position by its hash, so equal positions built anywhere share one object
+INTERNED = weakref.WeakValueDictionary()
+
+
+class Position():
+    """
+    Class for an immutable snapshot of a ChessVar position that can be used as a set member or dictionary key.
+    A Position holds the board as 64 piece codes, the side to move, the game state and the codes of each side's
+    lost and reserve fairy pieces, all read-only. It is hashed by the position's Zobrist hash, computed once, and
+    positions are interned: building a Position equal to one still alive returns that object, so identical
+    positions reached in different games share one object and usually compare equal by identity.
+    """
+
+    __slots__ = ("board", "turn", "game_state", "white_lost", "black_lost", "white_fairy", "black_fairy", "_hash",
+                 "__weakref__")
+
+    def __new__(cls, board, turn, game_state, white_lost, black_lost, white_fairy, black_fairy, hash_value=None):
+        board, white_lost, black_lost = bytes(board), bytes(white_lost), bytes(black_lost)
+        white_fairy, black_fairy = bytes(white_fairy), bytes(black_fairy)
+        if hash_value is None:
+            hash_value = zobrist_hash(board, turn, white_lost, black_lost, white_fairy, black_fairy)
+        interned = INTERNED.get(hash_value)
+        if interned is not None and interned.get_fields() == (board, turn, game_state, white_lost, black_lost,
+                                                             white_fairy, black_fairy):
+            return interned
+
+        position = object.__new__(cls)
+        set_field = object.__setattr__
+        set_field(position, "board", board)
+        set_field(position, "turn", turn)
+        set_field(position, "game_state", game_state)
+        set_field(position, "white_lost", white_lost)
+        set_field(position, "black_lost", black_lost)
+        set_field(position, "white_fairy", white_fairy)
+        set_field(position, "black_fairy", black_fairy)
+        set_field(position, "_hash", hash_value)
+        # on the rare hash collision with a different live position the new one is simply not interned
+        if interned is None:
+            INTERNED[hash_value] = position
+        return position
+
+    @classmethod
+    def from_game(cls, game):
+        """
+        Return the Position of a ChessVar game, reusing the hash the game keeps up to date
+        """
+        return cls(game.get_board_codes(), game.get_turn(), game.get_game_state(), game.get_lost_codes("WHITE"),
+                   game.get_lost_codes("BLACK"), game.get_fairy_codes("WHITE"), game.get_fairy_codes("BLACK"),
+                   game.get_hash())
+
+    def to_game(self, quiet=False, move_cache=None):
+        """
+        Return a new ChessVar game set up in this position, with no moves to take back
+        """
+        return ChessVar.from_position(self, quiet, move_cache)
+
+    def get_fields(self):
+        """
+        Return (board, turn, game_state, white_lost, black_lost, white_fairy, black_fairy)
+        """
+        return (self.board, self.turn, self.game_state, self.white_lost, self.black_lost, self.white_fairy,
+                self.black_fairy)
+
+    def get_hash(self):
+        """
+        Return the 64-bit Zobrist hash of the position, the same as ChessVar.get_hash() in this position
+        """
+        return self._hash
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Position is immutable; cannot set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Position is immutable; cannot delete {name}")
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Position):
+            return NotImplemented
+        return self._hash == other._hash and self.get_fields() == other.get_fields()
+
+    def __reduce__(self):
+        return Position, self.get_fields() + (self._hash,)
+
+    def __repr__(self):
+        return f"Position({self.to_game(quiet=True).to_notation()!r})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count the distinct positions reached by ChessVar games.")
+    parser.add_argument("games", nargs="?", default="-",
+                        help="text file with the moves of one game per line (default standard input)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seen = set()
+    plies = 0
+    for record in read_games([args.games]):
+        game = ChessVar(quiet=True)
+        seen.add(Position.from_game(game))
+        for move in record.moves:
+            if not game.apply_moves([move]):
+                break
+            seen.add(Position.from_game(game))
+            plies += 1
+    seconds = time.perf_counter() - start
+    print(f"{plies} plies  {len(seen)} distinct positions  {seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# kinds of score bound stored with an entry
+EXACT, LOWER, UPPER = 1, 2, 3
+
+ENTRY_BYTES = 16
+# layout of the 64-bit data word of an entry
+DEPTH_SHIFT = 16
+BOUND_SHIFT = 24
+AGE_SHIFT = 26
+SCORE_SHIFT = 34
+SCORE_OFFSET = 1 << 19
+# occupancy is estimated from this many entries at the start of the table
+OCCUPANCY_SAMPLE = 1000
+
+
+class TranspositionTable():
+    """
+    Class representing a fixed size transposition table keyed by the 64-bit position hash.
+    The table is allocated once from a megabyte budget and never grows. Each entry is two 64-bit words:
+    the key XORed with the data word, and the data word packing the best move, depth, score bound, score and the age
+    of the search that stored it. Storing the key XORed with the data lets a probe detect an entry torn by a
+    concurrent writer, so the words may live in memory shared between processes.
+    An entry is replaced when it comes from an older search or when the new entry is searched at least as deep.
+    """
+
+    def __init__(self, size_mb=16, buffer=None):
+        """
+        Allocate a table of size_mb megabytes, rounded down to a power of two entries.
+        buffer may be a writable buffer of at least that size, such as shared memory, to hold the entries instead.
+        """
+        entries = 1
+        while entries * 2 * ENTRY_BYTES <= size_mb * 1024 * 1024:
+            entries *= 2
+        if buffer is None:
+            buffer = bytearray(entries * ENTRY_BYTES)
+        self._bytes = memoryview(buffer).cast("B")[:entries * ENTRY_BYTES]
+        self._words = self._bytes.cast("Q")
+        self._mask = entries - 1
+        self._age = 0
+
+        # statistics
+        self._probes = 0
+        self._hits = 0
+        self._stores = 0
+
+    def get_size(self):
+        """
+        return the number of entries the table holds
+        """
+        return self._mask + 1
+
+    def new_search(self):
+        """
+        Start a new search so that entries left by earlier searches are replaced first
+        """
+        self._age = (self._age + 1) & 0xFF
+
+    def get_age(self):
+        """
+        return the age stamped on entries stored by the current search
+        """
+        return self._age
+
+    def set_age(self, age):
+        """
+        Stamp entries with the given age, so processes sharing the table agree on the current search
+        """
+        self._age = age & 0xFF
+
+    def clear(self):
+        """
+        Empty the table and reset its statistics
+        """
+        self._bytes[:] = bytes(len(self._bytes))
+        self._age = 0
+        self._probes = self._hits = self._stores = 0
+
+    def probe(self, key):
+        """
+        Return (depth, bound, score, move) stored for the position hash key, or None if it is not in the table
+        """
+        self._probes += 1
+        index = (key & self._mask) << 1
+        data = self._words[index + 1]
+        if data and self._words[index] ^ data == key:
+            self._hits += 1
+            return (data >> DEPTH_SHIFT & 0xFF, data >> BOUND_SHIFT & 3,
+                    (data >> SCORE_SHIFT) - SCORE_OFFSET, data & 0xFFFF)
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        """
+        Store the result of searching the position with hash key, unless a deeper entry from this search is in the way.
+        Scores must lie within +/- 2**19 and depths within 0-255.
+        """
+        index = (key & self._mask) << 1
+        words = self._words
+        old = words[index + 1]
+        if old:
+            if (old >> AGE_SHIFT & 0xFF) == self._age and old >> DEPTH_SHIFT & 0xFF > depth \
+                    and words[index] ^ old != key:
+                return
+            if not move and words[index] ^ old == key:
+                # keep the best move found by an earlier search of the same position
+                move = old & 0xFFFF
+
+        data = (move | depth << DEPTH_SHIFT | bound << BOUND_SHIFT | self._age << AGE_SHIFT
+                | (score + SCORE_OFFSET) << SCORE_SHIFT)
+        words[index] = key ^ data
+        words[index + 1] = data
+        self._stores += 1
+
+    def get_stats(self):
+        """
+        Return a dict with the probes, hits, hit rate, stores and occupancy.
+        Occupancy is the fraction of entries in use, estimated from a sample at the start of the table.
+        """
+        sample = min(OCCUPANCY_SAMPLE, self._mask + 1)
+        used = sum(1 for index in range(1, 2 * sample, 2) if self._words[index])
+        return {
+            "probes": self._probes,
+            "hits": self._hits,
+            "hit_rate": self._hits / self._probes if self._probes else 0.0,
+            "stores": self._stores,
+            "occupancy": used / sample,
+        }